@@ -0,0 +1,148 @@
+"""Benchmarks of World construction and each phase of World.update.
+
+Every configuration is run from a fixed seed, so runs are comparable
+between revisions. Results are written as JSON, and may be compared
+against a baseline written by an earlier run:
+
+    python benchmark.py --output baseline.json
+    python benchmark.py --baseline baseline.json --threshold 0.2
+
+Comparison exits with status 1 if any timing regressed by more than
+threshold (a fraction of the baseline timing).
+The scheduler is measured by running with and without --workers:
+
+    python benchmark.py --resolution 72 --plates 16 --workers 4
+
+"""
+
+import argparse
+import json
+import platform
+import sys
+import time
+from math import pi
+
+import numpy
+
+from pytectonics.world import World
+from pytectonics.grid.fibgrid import FibGrid
+from pytectonics.stats import Stats
+from pytectonics.scheduler import PlateScheduler
+
+
+def runConfig(resolution, plateNum, steps, seed, workers=None):
+    """Returns timings in seconds for one configuration,
+    phases being totals over every step.
+    Given a number of workers, collide and rift run with a PlateScheduler.
+
+    """
+    timings = {}
+
+    start = time.perf_counter()
+    FibGrid(2 * pi / resolution)
+    timings['grid'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    world = World(radius=6367, resolution=resolution, plateNum=plateNum,
+                  continentNum=3, continentSize=1250, Grid=FibGrid,
+                  seed=seed)
+    timings['init'] = time.perf_counter() - start
+
+    if workers:
+        world.scheduler = PlateScheduler(world, workers)
+    world.stats = Stats()
+    start = time.perf_counter()
+    for i in range(steps):
+        world.update(1.0)
+    timings['update'] = time.perf_counter() - start
+    if world.scheduler is not None:
+        world.scheduler.close()
+    timings.update(world.stats.getTotals()['phases'])
+    return timings
+
+
+def getKey(result):
+    return result['resolution'], result['plateNum'], result['steps']
+
+
+def run(resolutions, plateNums, steps, seed, repeat, workers=None):
+    results = []
+    for resolution in resolutions:
+        for plateNum in plateNums:
+            # the fastest of several runs is the least disturbed by noise
+            runs = [runConfig(resolution, plateNum, steps, seed, workers)
+                    for i in range(repeat)]
+            timings = {name: min(timing[name] for timing in runs)
+                       for name in runs[0]}
+            result = {'resolution': resolution, 'plateNum': plateNum,
+                      'steps': steps, 'seed': seed, 'timings': timings}
+            print('resolution %g, %d plates: init %.3fs, update %.3fs'
+                  % (resolution, plateNum, timings['init'],
+                     timings['update']))
+            results.append(result)
+    return {'python': platform.python_version(),
+            'numpy': numpy.__version__,
+            'platform': platform.platform(),
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'workers': workers,
+            'results': results}
+
+
+def compare(report, baseline, threshold):
+    """Prints the change of every timing found in both report and baseline,
+    returns the timings that regressed by more than threshold
+
+    """
+    baselines = {getKey(result): result for result in baseline['results']}
+    regressions = []
+    for result in report['results']:
+        key = getKey(result)
+        if key not in baselines:
+            continue
+        old = baselines[key]['timings']
+        for name, timing in sorted(result['timings'].items()):
+            if not old.get(name):
+                continue
+            ratio = timing / old[name]
+            regressed = ratio > 1 + threshold
+            print('resolution %g, %d plates, %s: %.4fs -> %.4fs (%+.0f%%)%s'
+                  % (key[0], key[1], name, old[name], timing,
+                     100 * (ratio - 1), ' REGRESSED' if regressed else ''))
+            if regressed:
+                regressions.append((key, name, ratio))
+    return regressions
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--resolution', type=float, nargs='+',
+                        default=[360 / 10, 360 / 20])
+    parser.add_argument('--plates', type=int, nargs='+', default=[7, 14])
+    parser.add_argument('--steps', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--workers', type=int,
+                        help='threads to run collide and rift on '
+                             'with a PlateScheduler, by default none')
+    parser.add_argument('--output', help='file to write results to as JSON')
+    parser.add_argument('--baseline', help='JSON results to compare against')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='fraction slower than baseline that counts '
+                             'as a regression')
+    args = parser.parse_args(args)
+
+    report = run(args.resolution, args.plates, args.steps, args.seed,
+                 args.repeat, args.workers)
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2)
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        if compare(report, baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
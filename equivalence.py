@@ -0,0 +1,115 @@
+"""Checks the faster paths of World.update against the plain ones.
+
+For each seed, a world is run serially alongside copies of it that take
+another path, and the CrustStore columns and collision hints of each are
+compared after every step:
+
+* scheduler: collide runs with a PlateScheduler
+* perCrust: collide resolves one crust at a time (Plate.collideCrust)
+  rather than in CollisionBatch passes
+* checkpoint: the world is saved and loaded again partway through
+
+Every run also checks the plate boundary masks on every refresh
+(Plate.checkBoundary).
+
+    python equivalence.py --seeds 1 2 3 --steps 30
+
+Exits with status 1 if any path differs from the serial run.
+
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+
+import numpy
+
+from pytectonics.world import World
+from pytectonics.plate import Plate
+from pytectonics.cruststore import CrustStore
+from pytectonics.scheduler import PlateScheduler
+
+
+class PerCrustWorld(World):
+    """A world whose plates collide one crust at a time"""
+
+    def collide(self):
+        for plate in self.plates:
+            plates = plate.getNearbyPlates()
+            for crust in sorted(plate.collidable, key=lambda crust: crust.id):
+                plate.collideCrust(crust, plates)
+
+
+def getState(world):
+    """Returns the state compared between runs, by name"""
+    store = world.crustStore
+    state = {name: getattr(store, name) for name in CrustStore.columns}
+    state['active'] = store.active
+    state['hints'] = numpy.array([plate.getHints()
+                                  for plate in store.plates])
+    return state
+
+
+def getDifferences(world, other):
+    """Returns the names of the parts of state that differ
+    between two worlds
+
+    """
+    state, otherState = getState(world), getState(other)
+    return [name for name in state
+            if not numpy.array_equal(state[name], otherState[name])]
+
+
+def check(seed, resolution, plateNum, steps, directory):
+    """Returns a list of the differences found, as messages"""
+    parameters = dict(radius=6367, resolution=resolution, plateNum=plateNum,
+                      continentNum=5, continentSize=2500, seed=seed)
+    serial = World(**parameters)
+    worlds = {'scheduler': World(**parameters),
+              'perCrust': PerCrustWorld(**parameters)}
+    scheduler = PlateScheduler(worlds['scheduler'])
+    worlds['scheduler'].scheduler = scheduler
+
+    messages = []
+    for step in range(steps):
+        if step == steps // 2:
+            file = os.path.join(directory, 'world-%d.npz' % seed)
+            serial.save(file)
+            worlds['checkpoint'] = World.load(file)
+        serial.update(1.0)
+        for name, world in list(worlds.items()):
+            world.update(1.0)
+            differences = getDifferences(serial, world)
+            if differences:
+                messages.append('seed %d, %s differs at step %d in %s'
+                                % (seed, name, step, ', '.join(differences)))
+                # later steps only repeat the difference
+                del worlds[name]
+    scheduler.close()
+    return messages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--seeds', type=int, nargs='+', default=[1, 2, 3])
+    parser.add_argument('--resolution', type=float, default=36)
+    parser.add_argument('--plates', type=int, default=16)
+    parser.add_argument('--steps', type=int, default=30)
+    args = parser.parse_args()
+
+    Plate.checkBoundary = True
+    messages = []
+    with tempfile.TemporaryDirectory() as directory:
+        for seed in args.seeds:
+            found = check(seed, args.resolution, args.plates, args.steps,
+                          directory)
+            print('seed %d: %s' % (seed, 'differs' if found else 'same'))
+            messages.extend(found)
+    for message in messages:
+        print(message)
+    return 1 if messages else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,5 +1,6 @@
-from .geocoordinate import GeoCoordinate
+from .geocoordinate import GeoCoordinate, GeoPoint
 from .grid import FibGrid
+from .cruststore import CrustStore
 from .crust import Crust
 from .plate import Plate
 from .world import World
@@ -0,0 +1,108 @@
+import numpy
+
+
+class CapIndex:
+    """World level broad phase between plates.
+    Each plate is bounded by a spherical cap, a center and an angular radius
+    about it, fit in world coordinates to the directions of the plate's
+    occupied cells. Plate frames aren't exact rotations, so world positions
+    of cells aren't of unit length, and are normalized before any angle
+    is taken. Caps are fit afresh once per update, after plates move,
+    and grow as crust is added. Which pairs of plates come near enough to
+    collide is kept in an overlap matrix, rebuilt along with the caps,
+    so plates are only ever tested against those whose caps meet their own.
+
+    """
+
+    def __init__(self, world, margin=3):
+        """margin is the number of average cell distances caps are grown by
+        when compared, covering the error of the approximate lookups
+        made against plates on either side
+
+        """
+        self.world = world
+        self.margin = margin
+        self.built = False
+        self._allocate()
+
+    def _allocate(self):
+        plateNum = len(self.world.crustStore.active)
+        # unit cap centers in world coordinates, and radii in radians,
+        # a radius of -inf standing for a plate without crust
+        self.centers = numpy.zeros((plateNum, 3))
+        self.radii = numpy.full(plateNum, -numpy.inf)
+        # whether the caps of each pair of plates may collide
+        self.overlaps = numpy.zeros((plateNum, plateNum), dtype=bool)
+
+    def _getDirections(self, plate, ids):
+        """Returns the unit directions of the world positions of cells"""
+        points = plate.grid.getCartesians()[ids]
+        return points / numpy.sqrt((points * points).sum(axis=1))[:, None]
+
+    def _getAngles(self, directions, center):
+        return numpy.arccos(numpy.clip(directions.dot(center), -1.0, 1.0))
+
+    def fit(self, plate):
+        """Fits the cap of a plate to the crust upon it"""
+        occupied = self.world.crustStore.occupied[plate.index]
+        directions = self._getDirections(plate, occupied)
+        if not len(directions):
+            self.radii[plate.index] = -numpy.inf
+            return
+        center = directions.sum(axis=0)
+        length = numpy.sqrt(center.dot(center))
+        # crust spread all about the globe has no meaningful middle
+        center = center / length if length > 1e-9 else directions[0]
+        self.centers[plate.index] = center
+        self.radii[plate.index] = self._getAngles(directions, center).max()
+
+    def _getOverlaps(self, index):
+        angles = self._getAngles(self.centers, self.centers[index])
+        return angles <= self.radii + self.radii[index] + \
+            self.margin * self.world.avgDistance
+
+    def rebuild(self):
+        if len(self.radii) != len(self.world.crustStore.active):
+            self._allocate()
+        self.radii[:] = -numpy.inf
+        for plate in self.world.plates:
+            self.fit(plate)
+        self.overlaps[:] = False
+        for plate in self.world.plates:
+            self.overlaps[plate.index] = self._getOverlaps(plate.index)
+        self.built = True
+
+    def addAll(self, plate, ids):
+        """Grows the cap of a plate over new crust in the given cells"""
+        if not self.built or not len(ids):
+            return
+        index = plate.index
+        if self.radii[index] == -numpy.inf:
+            self.fit(plate)
+        else:
+            directions = self._getDirections(
+                plate, numpy.asarray(ids, dtype=int) % plate.grid.totalPointNum)
+            radius = self._getAngles(directions, self.centers[index]).max()
+            if radius <= self.radii[index]:
+                return
+            self.radii[index] = radius
+        overlaps = self._getOverlaps(index)
+        self.overlaps[index] |= overlaps
+        self.overlaps[:, index] |= overlaps
+
+    def getCap(self, plate):
+        """Returns the unit center of the cap of a plate in world coordinates
+        and its radius, as of the last rebuild or growth
+
+        """
+        return self.centers[plate.index], self.radii[plate.index]
+
+    def getPlates(self, plate, plates):
+        """Returns those of plates whose caps may meet that of plate,
+        in the order given. Every plate may meet until the index is built.
+
+        """
+        if not self.built:
+            return plates
+        overlaps = self.overlaps[plate.index]
+        return [other for other in plates if overlaps[other.index]]
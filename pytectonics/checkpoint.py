@@ -0,0 +1,235 @@
+"""Saving and restoring a World as arrays in a numpy .npz file.
+
+Crust lives in the columns of the CrustStore, so a checkpoint is mostly
+those columns written out as they are. Everything else that refers to
+crust or plates (subduction links, docking crust, tracked collisions)
+is written as flat cell indices or plate indices, so no object graph is
+pickled. Crust objects, plate boundaries and the ownership index are
+rebuilt from the arrays upon loading.
+
+A delta checkpoint holds only the cells that changed since the last full
+checkpoint of the same world, along with the (small) state of each plate,
+and names the full checkpoint it was taken against.
+
+"""
+
+import os
+import random
+from ast import literal_eval
+import numpy
+from pytectonics import grid as grids
+from pytectonics.cruststore import CrustStore
+from pytectonics.crust import Crust
+from pytectonics.plate import Plate
+from pytectonics.ownershipindex import OwnershipIndex
+from pytectonics.capindex import CapIndex
+
+version = 1
+
+worldAttributes = ['age', 'radius', 'seaLevel', 'maxMountainWidth',
+                   'avgDistance', 'minDistance']
+
+# arrays laid out by (plate index, cell index), compared cell by cell
+# when writing a delta checkpoint
+cellArrays = CrustStore.columns + ['collisions']
+
+
+def getPath(file):
+    return file if file.endswith('.npz') else file + '.npz'
+
+
+def getCellArrays(world):
+    store = world.crustStore
+    arrays = {name: getattr(store, name) for name in CrustStore.columns}
+    collisions = numpy.full(store.occupied.shape, -1, dtype=numpy.int32)
+    for plate in store.plates:
+        collisions[plate.index] = plate.getHints()
+    arrays['collisions'] = collisions
+    return arrays
+
+
+def getPlateArrays(world):
+    store = world.crustStore
+    plates = store.plates
+    arrays = {
+        'active': world.crustStore.active,
+        'plates': numpy.array([plate.index for plate in world.plates],
+                              dtype=numpy.int32),
+        'speed': numpy.array([plate.speed for plate in plates]),
+        'densityOffset': numpy.array([plate.densityOffset
+                                      for plate in plates]),
+        'eulerPole': numpy.array([plate.eulerPole for plate in plates],
+                                 dtype=float).reshape(-1, 3),
+        'axis': numpy.array([plate.grid.frame.axis for plate in plates],
+                            dtype=float).reshape(-1, 3),
+        'spherical': numpy.array([numpy.nan if plate._spherical is None
+                                  else (plate._spherical[0],
+                                        plate._spherical[1])
+                                  for plate in plates],
+                                 dtype=float).reshape(-1, 2),
+        'cartesian': numpy.array([numpy.nan if plate._cartesian is None
+                                  else plate._cartesian
+                                  for plate in plates],
+                                 dtype=float).reshape(-1, 3),
+    }
+    docking = sorted((plate.index, crust._index)
+                     for plate in plates for crust in plate._docking)
+    docking = numpy.array(docking, dtype=numpy.int64).reshape(-1, 2)
+    arrays['dockingPlate'], arrays['docking'] = docking[:, 0], docking[:, 1]
+    return arrays
+
+
+def getWorldArrays(world):
+    arrays = {'version': numpy.array(version),
+              'grid': numpy.array(type(world.template).__name__),
+              'ownershipBuilt': numpy.array(world.ownership.built),
+              'seed': numpy.array(repr(world.seed))}
+    for name in worldAttributes:
+        arrays[name] = numpy.array(getattr(world, name))
+    randomVersion, randomState, gauss = world.random.getstate()
+    arrays['randomVersion'] = numpy.array(randomVersion)
+    arrays['randomState'] = numpy.array(randomState, dtype=numpy.int64)
+    arrays['randomGauss'] = numpy.array(numpy.nan if gauss is None else gauss)
+    return arrays
+
+
+def getArrays(world):
+    """Returns the arrays of a full checkpoint of world"""
+    arrays = getCellArrays(world)
+    arrays.update(getPlateArrays(world))
+    arrays.update(getWorldArrays(world))
+    return arrays
+
+
+def save(world, file, delta=False):
+    """Writes a checkpoint of world to the path file.
+    If delta is set, only cells that have changed since the last full
+    checkpoint of the world are written. A full checkpoint is written
+    instead when there is none to build upon.
+
+    """
+    file = getPath(file)
+    arrays = getCellArrays(world)
+    base = getattr(world, '_checkpoint', None)
+    if delta and base and all(arrays[name].shape == base[1][name].shape
+                              for name in cellArrays):
+        path, baseArrays = base
+        changed = numpy.zeros(arrays['occupied'].shape, dtype=bool)
+        for name in cellArrays:
+            changed |= arrays[name] != baseArrays[name]
+        changed = numpy.flatnonzero(changed)
+        cells = {name: arrays[name].ravel()[changed] for name in cellArrays}
+        cells['changed'] = changed
+        cells['base'] = numpy.array(os.path.relpath(
+            path, os.path.dirname(os.path.abspath(file))))
+        arrays = cells
+    else:
+        world._checkpoint = (os.path.abspath(file),
+                             {name: column.copy()
+                              for name, column in arrays.items()})
+
+    arrays.update(getPlateArrays(world))
+    arrays.update(getWorldArrays(world))
+    numpy.savez(file, **arrays)
+
+
+def read(file):
+    """Returns the arrays of a checkpoint as a dictionary,
+    applying a delta checkpoint to the full checkpoint it names.
+    Also returns the path of that full checkpoint and its cell arrays,
+    which later delta checkpoints are taken against.
+
+    """
+    file = getPath(file)
+    with numpy.load(file) as data:
+        arrays = dict(data.items())
+    if arrays['version'] != version:
+        raise ValueError('unsupported checkpoint version %s'
+                         % arrays['version'])
+    if 'base' not in arrays:
+        return arrays, os.path.abspath(file), \
+            {name: arrays[name].copy() for name in cellArrays}
+
+    path = os.path.join(os.path.dirname(os.path.abspath(file)),
+                        str(arrays.pop('base')))
+    base, path, baseArrays = read(path)
+    changed = arrays.pop('changed')
+    for name in cellArrays:
+        column = base[name]
+        column.ravel()[changed] = arrays[name]
+        arrays[name] = column
+    return arrays, path, baseArrays
+
+
+def load(World, file):
+    """Returns a World restored from the checkpoint at the path file"""
+    arrays, path, baseArrays = read(file)
+    world = build(World, arrays)
+    world._checkpoint = (path, baseArrays)
+    return world
+
+
+def build(World, arrays, template=None):
+    """Returns a World built from the arrays of a full checkpoint,
+    upon template if given, which must match the grid of the arrays
+
+    """
+    world = World.__new__(World)
+    world.stages = []
+    world.stats = None
+    world.events = None
+    world.scheduler = None
+    world.seed = literal_eval(str(arrays['seed']))
+    world.random = random.Random()
+    gauss = arrays['randomGauss'].item()
+    world.random.setstate((arrays['randomVersion'].item(),
+                           tuple(arrays['randomState'].tolist()),
+                           None if numpy.isnan(gauss) else gauss))
+    for name in worldAttributes:
+        setattr(world, name, arrays[name].item())
+
+    Grid = getattr(grids, str(arrays['grid']))
+    if template is None:
+        template = Grid(world.avgDistance)
+    world.template = template
+    store = CrustStore(world, template.totalPointNum,
+                       len(arrays['active']))
+    for name in ['active'] + CrustStore.columns:
+        getattr(store, name)[:] = arrays[name]
+    store.indexLinks()
+    world.crustStore = store
+    world.ownership = OwnershipIndex(world, template)
+    world.caps = CapIndex(world)
+
+    plates = []
+    for index in range(len(arrays['speed'])):
+        spherical, cartesian = arrays['spherical'][index], \
+            arrays['cartesian'][index]
+        grid = template.getSharedGrid()
+        grid.frame.axis = arrays['axis'][index].copy()
+        plates.append(Plate.restore(
+            world, grid, index,
+            None if numpy.isnan(spherical).any()
+            else tuple(spherical.tolist()),
+            None if numpy.isnan(cartesian).any() else cartesian.copy(),
+            arrays['speed'][index].item(),
+            arrays['eulerPole'][index].copy(),
+            arrays['densityOffset'][index].item()))
+    store.plates = plates
+    world.plates = [plates[index] for index in arrays['plates']]
+
+    for plate in plates:
+        ids = plate.grid.getIndicesAt(
+            numpy.flatnonzero(store.occupied[plate.index]))
+        Crust.bindAll(plate, world, ids.tolist())
+        plate._collidable, plate._riftable = plate.getBoundary()
+        plate._changed = set()
+        # hints are stamped with the fresh generation, so all hold
+        plate._partners[:] = arrays['collisions'][plate.index]
+    for index, crust in zip(arrays['dockingPlate'], arrays['docking']):
+        plates[index]._docking.add(store.getCrust(crust))
+
+    if arrays['ownershipBuilt']:
+        world.ownership.rebuild()
+        world.caps.rebuild()
+    return world
@@ -0,0 +1,154 @@
+import numpy
+from pytectonics.utils import getArcDistanceArray
+
+
+class CollisionBatch:
+    """Collisions found along the boundary of a plate,
+    resolved together in array passes.
+    Crust is added one collision at a time, in the order Crust.collide
+    would have processed them. A collision is only accepted into the batch
+    if none of the cells it reads or writes (both crusts and the crusts they
+    are linked to) are touched by a collision already in the batch,
+    otherwise the batch must be flushed first. Collisions within a batch are
+    then independent of one another, so classifying them (top and bottom,
+    detachment, eruption) and writing their results can be done for the whole
+    batch at once while giving the same results as Crust.collide.
+    Only destruction of crust and docking go back to per object code.
+
+    """
+
+    def __init__(self, plate):
+        self.plate = plate
+        self.store = plate.world.crustStore
+        self.clear()
+
+    def clear(self):
+        self.crusts = []
+        self.indices = []
+        self.partners = []
+        self.touched = set()
+
+    def __len__(self):
+        return len(self.crusts)
+
+    def getTouched(self, index, partner):
+        """Returns flat indices of the cells a collision depends upon"""
+        store = self.store
+        touched = {index,
+                   store.subducts.item(index), store.subductedBy.item(index)}
+        if partner >= 0:
+            touched |= {partner,
+                        store.subducts.item(partner),
+                        store.subductedBy.item(partner)}
+        touched.discard(-1)
+        return touched
+
+    def conflicts(self, touched):
+        return not self.touched.isdisjoint(touched)
+
+    def add(self, crust, partner, touched):
+        """Adds the collision of crust with the crust at the flat index partner,
+        or -1 where crust collided with nothing
+
+        """
+        self.crusts.append(crust)
+        self.indices.append(crust._index)
+        self.partners.append(partner)
+        self.touched |= touched
+
+    def flush(self):
+        if not self.crusts:
+            return
+        store = self.store
+        world = self.plate.world
+        indices = numpy.array(self.indices, dtype=numpy.int64)
+        partners = numpy.array(self.partners, dtype=numpy.int64)
+        hit = partners >= 0
+        others = numpy.where(hit, partners, indices)
+
+        # crust that collided with nothing stops being subducted
+        free = ~hit & store.isSubducted(indices)
+
+        # subducted crust stays on the bottom,
+        # otherwise lightest crust goes on top
+        density = store.density.ravel()
+        selfOnTop = ~store.isSubducted(indices) & \
+            (store.isSubducted(others) | (density[indices] <= density[others]))
+        top = numpy.where(selfOnTop, indices, others)
+        bottom = numpy.where(selfOnTop, others, indices)
+        linked = (store.subducts.ravel()[top] == bottom) & \
+            (store.subductedBy.ravel()[bottom] == top)
+        acting = hit & ~linked
+
+        first = store.firstSubductedBy.ravel()[bottom]
+        detaching = first >= 0
+        if detaching.any():
+            cartesians = store.getCartesians()
+            distance = getArcDistanceArray(cartesians[bottom[detaching]],
+                                           cartesians[first[detaching]])
+            detaching[detaching] = \
+                world.radiansToDistance(distance) > world.maxMountainWidth
+        continent = store.isContinent(top) & store.isContinent(bottom)
+
+        dock = acting & detaching & continent
+        erupt = acting & detaching & ~continent
+        subduct = acting & ~detaching
+
+        stats = world.stats
+        if stats is not None:
+            stats.count('collisions', int(hit.sum()))
+            stats.count('subductions', int((subduct & (first < 0)).sum()))
+            stats.count('eruptions', int(erupt.sum()))
+            stats.count('destroyed', int(erupt.sum()))
+
+        # docking reads whole continents, so other collisions are
+        # written out around it in the order they were found
+        start = 0
+        for end in list(numpy.flatnonzero(dock)) + [len(indices)]:
+            rows = slice(start, end)
+            self._apply(rows, top, bottom, first, free, erupt, subduct)
+            if end < len(indices):
+                topCrust = store.getCrust(top[end])
+                bottomCrust = store.getCrust(bottom[end])
+                bottomCrust.plate.requestDock(topCrust, bottomCrust)
+            start = end + 1
+        self.clear()
+
+    def _apply(self, rows, top, bottom, first, free, erupt, subduct):
+        store = self.store
+        crusts = self.crusts[rows]
+        top, bottom, first = top[rows], bottom[rows], first[rows]
+        free, erupt, subduct = free[rows], erupt[rows], subduct[rows]
+
+        freed = numpy.array(self.indices[rows], dtype=numpy.int64)[free]
+        store.setLinks(store.subducts, store.subductedBy.ravel()[freed], -1)
+        store.setLinks(store.subductedBy, freed, -1)
+
+        # erupt volcano, where none has occurred before
+        store.erupt(top[erupt])
+
+        store.firstSubductedBy.ravel()[bottom[subduct]] = numpy.where(
+            first[subduct] < 0, top[subduct], first[subduct])
+        store.setLinks(store.subducts, top[subduct], bottom[subduct])
+        store.setLinks(store.subductedBy, bottom[subduct], top[subduct])
+        events = store.world.events
+        if events is not None:
+            onset = bottom[subduct & (first < 0)]
+            events.emit('subduction', store.getCartesians()[onset],
+                        onset // store.cellNum,
+                        top[subduct & (first < 0)] // store.cellNum,
+                        store.thickness.ravel()[onset])
+
+        for i, crust in enumerate(crusts):
+            if free[i]:
+                self.plate.update(crust)
+            elif erupt[i]:
+                topCrust = store.getCrust(top[i])
+                # destroy crust
+                store.getCrust(bottom[i]).destroy()
+                topCrust.plate.update(topCrust)
+            elif subduct[i]:
+                bottomCrust = store.getCrust(bottom[i])
+                topCrust = store.getCrust(top[i])
+                bottomCrust.plate.update(bottomCrust)
+                topCrust.plate.update(topCrust)
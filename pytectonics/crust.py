@@ -1,33 +1,54 @@
 from pytectonics.utils import toSpherical, moment
-from pytectonics import GeoCoordinate
+from pytectonics import GeoPoint
 
 
-class Crust(GeoCoordinate):
+class Crust(GeoPoint):
+    """A single cell of crust upon a plate.
+    Crust is a view onto one cell of the world's CrustStore,
+    which holds the actual thickness, density, displacement and
+    subduction state of every crust in columnar arrays.
+    A crust holds only its plate, its id and its flat index into the store,
+    everything else, the world included, is found through its plate.
+
+    """
+
+    __slots__ = ('_plate', '_id', '_index')
+
     def __init__(self, plate, world, isContinent=False, id=None):
-        self.world = world
+        self._bind(plate, world, id)
+
+        world.crustStore.create(plate, id, isContinent)
+
+        plate.add(self)
+
+    def _bind(self, plate, world, id):
         self._plate = plate
         self._id = id
-        self._cartesian = plate.grid.points[id]
+        self._index = world.crustStore.getIndex(plate, id)
 
-        self.subductedBy = None
-        self.subducts = None
-        self._firstSubductedBy = None
+    @classmethod
+    def createAll(cls, plate, world, ids, isContinent=False):
+        """Creates crust in many cells of a plate at once.
+        The store is written for all cells together and the plate
+        updates its boundary once, after every crust is added.
 
-        self._isContinent = isContinent
-        if isContinent:
-            # +/- 2900, estimate for shields, Zandt & Ammon 1995
-            thickness = 36900
-            density = world.continentCrustDensity + plate.densityOffset
-        else:
-            thickness = 7100  # +/- 800, White McKenzie and O'nions 1992
-            density = world.oceanCrustDensity + plate.densityOffset
-        self.density = density
-        self._thickness = thickness
+        """
+        world.crustStore.create(plate, ids, isContinent)
+        return cls.bindAll(plate, world, ids)
 
-        rootDepth = self._thickness * self.density / self.world.mantleDensity
-        self.displacement = self._thickness - rootDepth
+    @classmethod
+    def bindAll(cls, plate, world, ids):
+        """Creates crust in many cells of a plate whose values
+        are already held in the store, as when loading a checkpoint
 
-        plate.add(self)
+        """
+        crusts = []
+        for id in ids:
+            crust = cls.__new__(cls)
+            crust._bind(plate, world, id)
+            crusts.append(crust)
+        plate.addAll(crusts)
+        return crusts
 
     def _getPlate(self):
         return self._plate
@@ -37,22 +58,94 @@ class Crust(GeoCoordinate):
 
     plate = property(_getPlate, _setPlate)
 
+    def _getWorld(self):
+        return self._plate.world
+
+    world = property(_getWorld)
+
     def _getId(self):
         return self._id
 
     def _setId(self, id):
         self._id = id
-        self._cartesian = self.plate.grid.points[id]
+        self._index = self.world.crustStore.getIndex(self.plate, id)
 
     id = property(_getId, _setId)
 
+    def _getKey(self):
+        """Returns the (plate index, cell index) of the crust in the store"""
+        return divmod(self._index, self._plate.world.crustStore.cellNum)
+
+    _key = property(_getKey)
+
+    # ---STORED PROPERTIES
+    def _getStoredThickness(self):
+        return self.world.crustStore.thickness[self._key]
+
+    def _setStoredThickness(self, thickness):
+        self.world.crustStore.thickness[self._key] = thickness
+
+    _thickness = property(_getStoredThickness, _setStoredThickness)
+
+    def _getStoredDensity(self):
+        return self.world.crustStore.density[self._key]
+
+    def _setStoredDensity(self, density):
+        self.world.crustStore.density[self._key] = density
+
+    density = property(_getStoredDensity, _setStoredDensity)
+
+    def _getDisplacement(self):
+        return self.world.crustStore.displacement[self._key]
+
+    def _setDisplacement(self, displacement):
+        self.world.crustStore.displacement[self._key] = displacement
+
+    displacement = property(_getDisplacement, _setDisplacement)
+
+    def _getLink(self, links):
+        store = self.world.crustStore
+        index = links[self._key]
+        return store.getCrust(index) if store.isLinked(index) else None
+
+    def _setLink(self, links, crust):
+        self.world.crustStore.setLinks(links, self._index,
+                                       crust._index if crust else -1)
+
+    def _getSubducts(self):
+        return self._getLink(self.world.crustStore.subducts)
+
+    def _setSubducts(self, crust):
+        self._setLink(self.world.crustStore.subducts, crust)
+
+    subducts = property(_getSubducts, _setSubducts)
+
+    def _getSubductedBy(self):
+        return self._getLink(self.world.crustStore.subductedBy)
+
+    def _setSubductedBy(self, crust):
+        self._setLink(self.world.crustStore.subductedBy, crust)
+        self.plate.update(self)
+
+    subductedBy = property(_getSubductedBy, _setSubductedBy)
+
+    def _getFirstSubductedBy(self):
+        return self._getLink(self.world.crustStore.firstSubductedBy)
+
+    def _setFirstSubductedBy(self, crust):
+        # only ever read from the crust itself, so no record is kept of it
+        self.world.crustStore.firstSubductedBy[self._key] = \
+            crust._index if crust else -1
+
+    _firstSubductedBy = property(_getFirstSubductedBy, _setFirstSubductedBy)
+
     def _getSpherical(self):
         return toSpherical(self.cartesian)
 
     spherical = property(_getSpherical)
 
     def _getCartesian(self):
-        return self.plate.grid.frame.frame_to_world(self._cartesian)
+        return self.plate.grid.getCartesian(self._id)
 
     cartesian = property(_getCartesian)
 
@@ -72,19 +165,23 @@ class Crust(GeoCoordinate):
           introduce even more user un-friendly parameters
 
         """
-        if not self._firstSubductedBy:
+        first = self.world.crustStore.firstSubductedBy[self._key]
+        if first < 0:
             return False
         else:
+            # the cell subducted under is measured to even once vacated,
+            # its position is kept up by the frame of its plate
             distanceSubductedAngular = self.getArcDistance(
-                self._firstSubductedBy)
+                toSpherical(self.world.crustStore.getCartesian(first)))
             distanceSubducted = self.world.radiansToDistance(
                 distanceSubductedAngular)
             return distanceSubducted > self.world.maxMountainWidth
 
     def _getPressure(self):
         pressure = self._thickness * self.density
-        if self.subducts:
-            pressure += self.subducts._thickness * self.subducts.density
+        subducts = self.subducts
+        if subducts:
+            pressure += subducts._thickness * subducts.density
         # include water
         # if self.elevation < 0 and not self.subductedBy:
         #    pressure += -self.elevation * self.world.waterDensity
@@ -117,8 +214,9 @@ class Crust(GeoCoordinate):
     def _getThickness(self):
         thickness = self._thickness
         # include water
-        if self.subducts:
-            thickness += self.subducts._thickness
+        subducts = self.subducts
+        if subducts:
+            thickness += subducts._thickness
         # if self.elevation < 0 and not self.subductedBy:
         #    thickness += -self.elevation
         return thickness
@@ -156,27 +254,12 @@ class Crust(GeoCoordinate):
           detaches from subducting crust, i.e. at a depth defined by the 
           subducting crust's thickness.
         """
-        meltDensity = self.world.continentCrustDensity
-        rockDensity = self.world.oceanCrustDensity
-        thickness = self.thickness
-        if self.elevation < 0:
-            thickness -= ((meltDensity - self.world.waterDensity) / (
-                        self.density - meltDensity)) * \
-                         abs(self.elevation)
-            height = thickness * ((self.density - meltDensity)
-                                  / meltDensity)
-            heightChange = height + abs(self.elevation)
-        else:
-            heightChange = thickness * ((self.density - meltDensity)
-                                        / meltDensity)
-        pressure = (thickness * self.density) + \
-                   (heightChange * self.density)
-        density = pressure / (thickness + heightChange)
-
-        self._thickness += heightChange
-        self.density = density
+        self.world.crustStore.erupt([self._index])
 
     def collide(self, other, densityThreshold=.1):
+        stats = self.world.stats
+        if stats is not None:
+            stats.count('collisions')
         if self.subductedBy:
             top, bottom = other, self
         elif other.subductedBy:
@@ -198,9 +281,19 @@ class Crust(GeoCoordinate):
                     # destroy crust
                     bottom.destroy()
                     top.plate.update(top)
+                    if stats is not None:
+                        stats.count('eruptions')
+                        stats.count('destroyed')
             else:
-                if not bottom._firstSubductedBy:
+                if bottom.world.crustStore.firstSubductedBy[bottom._key] < 0:
                     bottom._firstSubductedBy = top
+                    events = self.world.events
+                    if events is not None:
+                        events.emit('subduction', bottom.cartesian,
+                                    bottom.plate.index, top.plate.index,
+                                    bottom._thickness)
+                    if stats is not None:
+                        stats.count('subductions')
 
                 top.subducts = bottom
                 bottom.subductedBy = top
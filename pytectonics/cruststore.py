@@ -0,0 +1,270 @@
+import numpy
+
+
+class CrustStore:
+    """Columnar storage for the crust of every plate in a world.
+    Each column is a numpy array indexed by (plate index, cell index),
+    where the plate index is the row a plate is given when it registers
+    and the cell index is a FibGrid index. Negative grid indices wrap
+    around exactly as they do for FibGrid.coverage.
+    Links between crusts (subduction) are stored as flat indices into the
+    raveled columns, with -1 standing for no link. A link is only live while
+    the cell it points to is occupied.
+    Crust objects are thin views onto a single cell of this store.
+
+    """
+
+    # +/- 2900, estimate for shields, Zandt & Ammon 1995
+    continentThickness = 36900
+    # +/- 800, White McKenzie and O'nions 1992
+    oceanThickness = 7100
+    continentThreshold = 17000
+
+    columns = ['occupied', 'thickness', 'density', 'displacement',
+               'continent', 'subducts', 'subductedBy', 'firstSubductedBy']
+
+    def __init__(self, world, cellNum, plateNum=0):
+        self.world = world
+        self.cellNum = cellNum
+        self.plates = []
+        self._allocate(plateNum)
+        self._cartesians = None
+        self._cartesiansVersions = None
+        # cells linking to each cell, by flat index, see setLinks
+        self._referrers = {}
+
+    def _allocate(self, plateNum):
+        shape = (plateNum, self.cellNum)
+        self.active = numpy.zeros(plateNum, dtype=bool)
+        self.occupied = numpy.zeros(shape, dtype=bool)
+        self.thickness = numpy.zeros(shape)
+        self.density = numpy.zeros(shape)
+        self.displacement = numpy.zeros(shape)
+        self.continent = numpy.zeros(shape, dtype=bool)
+        self.subducts = numpy.full(shape, -1, dtype=numpy.int64)
+        self.subductedBy = numpy.full(shape, -1, dtype=numpy.int64)
+        self.firstSubductedBy = numpy.full(shape, -1, dtype=numpy.int64)
+
+    def addPlate(self, plate):
+        """Registers a plate and returns the row index of its cells"""
+        index = len(self.plates)
+        if index >= len(self.active):
+            grown = max(2 * len(self.active), 1)
+            old = {name: getattr(self, name) for name in self.columns}
+            active = self.active
+            self._allocate(grown)
+            self.active[:index] = active
+            for name, column in old.items():
+                getattr(self, name)[:index] = column
+        self.plates.append(plate)
+        self.active[index] = True
+        return index
+
+    def removePlate(self, plate):
+        self.active[plate.index] = False
+
+    # ---INDEX METHODS
+    def getKey(self, plate, id):
+        """Returns the (plate index, cell index) of a cell"""
+        return plate.index, id % self.cellNum
+
+    def getIndex(self, plate, id):
+        """Returns the flat index of a cell, as used by links"""
+        return plate.index * self.cellNum + id % self.cellNum
+
+    def getIndices(self, plate):
+        """Returns the flat indices of every cell of a plate"""
+        start = plate.index * self.cellNum
+        return numpy.arange(start, start + self.cellNum)
+
+    def getCrust(self, index):
+        """Returns the crust occupying the cell at a flat index, if any"""
+        if index < 0:
+            return None
+        plate = self.plates[index // self.cellNum]
+        return plate.grid[index % self.cellNum]
+
+    def getCartesian(self, index):
+        """Returns the world position of the cell at a flat index"""
+        plate = self.plates[index // self.cellNum]
+        return plate.grid.getCartesian(index % self.cellNum)
+
+    def getCartesians(self):
+        """Returns the world position of every cell of every registered plate
+        as an array laid out by flat index.
+        Reused for as long as no plate frame rotates.
+
+        """
+        versions = [plate.grid.frame.version for plate in self.plates]
+        if versions != self._cartesiansVersions:
+            self._cartesians = numpy.concatenate(
+                [plate.grid.getCartesians() for plate in self.plates])
+            self._cartesiansVersions = versions
+        return self._cartesians
+
+    def isLinked(self, index):
+        return index >= 0 and self.occupied.item(index)
+
+    # ---COLLECTION METHODS
+    def setLinks(self, links, indices, targets):
+        """Links the cells at flat indices to targets, -1 for none,
+        in links, either subducts or subductedBy. Every write to those
+        columns goes through here, so the store knows which cells link to
+        each cell, and unlink only has to look at those.
+        Works equally for a single index or an array of them.
+
+        """
+        indices = numpy.atleast_1d(indices)
+        targets = numpy.broadcast_to(targets, indices.shape)
+        old = links.ravel()[indices]
+        links.ravel()[indices] = targets
+        changed = numpy.flatnonzero(old != targets)
+        if not len(changed):
+            return
+        subducts, subductedBy = self.subducts.ravel(), self.subductedBy.ravel()
+        referrers = self._referrers
+        for index, old, target in zip(indices[changed].tolist(),
+                                      old[changed].tolist(),
+                                      targets[changed].tolist()):
+            # the cell may still link to its old target through the other
+            if old >= 0 and subducts.item(index) != old and \
+                    subductedBy.item(index) != old:
+                linking = referrers.get(old)
+                if linking is not None:
+                    linking.discard(index)
+                    if not linking:
+                        del referrers[old]
+            if target >= 0:
+                referrers.setdefault(target, set()).add(index)
+
+    def indexLinks(self):
+        """Records which cells link to each cell afresh from the columns"""
+        self._referrers = {}
+        for links in [self.subducts, self.subductedBy]:
+            indices = numpy.flatnonzero(links.ravel() >= 0)
+            for index, target in zip(indices.tolist(),
+                                     links.ravel()[indices].tolist()):
+                self._referrers.setdefault(target, set()).add(index)
+
+    def unlink(self, index):
+        """Clears every link to the cell at a flat index,
+        called once the crust there is removed.
+        Plates of crust that were subducted by it are told of the change.
+
+        """
+        subducts, subductedBy = self.subducts.ravel(), self.subductedBy.ravel()
+        for other in self._referrers.pop(index, ()):
+            if subducts.item(other) == index:
+                subducts[other] = -1
+            if subductedBy.item(other) == index:
+                subductedBy[other] = -1
+                crust = self.getCrust(other)
+                if crust:
+                    crust.plate.update(crust)
+
+    def create(self, plate, ids, isContinent):
+        """Initializes the cells of a plate given by ids as fresh crust.
+        Works equally for a single id or an array of them.
+
+        """
+        key = plate.index, numpy.asarray(ids, dtype=int) % self.cellNum
+        isContinent = numpy.asarray(isContinent, dtype=bool)
+        thickness = numpy.where(isContinent,
+                                self.continentThickness,
+                                self.oceanThickness)
+        density = numpy.where(isContinent,
+                              self.world.continentCrustDensity,
+                              self.world.oceanCrustDensity) \
+            + plate.densityOffset
+        rootDepth = thickness * density / self.world.mantleDensity
+        self.thickness[key] = thickness
+        self.density[key] = density
+        self.displacement[key] = thickness - rootDepth
+        self.continent[key] = isContinent
+        indices = key[0] * self.cellNum + key[1]
+        self.setLinks(self.subducts, indices, -1)
+        self.setLinks(self.subductedBy, indices, -1)
+        self.firstSubductedBy[key] = -1
+
+    # ---WHOLE ARRAY PROPERTIES
+    # each of these returns an array shaped like the columns,
+    # or when given flat indices, an array of values for those cells only
+    def _getColumn(self, column, indices):
+        if indices is None:
+            return column
+        return column.ravel()[indices]
+
+    def _getLinked(self, links):
+        """Returns a mask of live links and the links clipped for gathering"""
+        clipped = numpy.maximum(links, 0)
+        live = (links >= 0) & self.occupied.ravel()[clipped]
+        return live, clipped
+
+    def isSubducted(self, indices=None):
+        live, _ = self._getLinked(self._getColumn(self.subductedBy, indices))
+        return live
+
+    def getThickness(self, indices=None):
+        live, subducts = self._getLinked(self._getColumn(self.subducts,
+                                                         indices))
+        return self._getColumn(self.thickness, indices) + \
+            numpy.where(live, self.thickness.ravel()[subducts], 0)
+
+    def getPressure(self, indices=None):
+        live, subducts = self._getLinked(self._getColumn(self.subducts,
+                                                         indices))
+        pressure = self._getColumn(self.thickness, indices) * \
+            self._getColumn(self.density, indices)
+        return pressure + numpy.where(live,
+                                      self.thickness.ravel()[subducts] *
+                                      self.density.ravel()[subducts],
+                                      0)
+
+    def getElevation(self, indices=None):
+        return self._getColumn(self.displacement, indices) - \
+            self.world.seaLevel
+
+    def isContinent(self, indices=None):
+        return self.getThickness(indices) > self.continentThreshold
+
+    # ---WHOLE ARRAY OPERATIONS
+    def isostacy(self):
+        """Vectorized equivalent of Crust.isostacy over every crust
+        on every living plate
+
+        """
+        mask = self.occupied & self.active[:, None]
+        thickness = self.getThickness()
+        rootDepth = thickness * self.density / self.world.mantleDensity
+        self.displacement[mask] = (thickness - rootDepth)[mask]
+        self.continent[mask] = (thickness > self.continentThreshold)[mask]
+
+    def erupt(self, indices):
+        """Vectorized equivalent of Crust.erupt over the crusts
+        at the given flat indices. Indices are expected to be unique.
+
+        """
+        indices = numpy.asarray(indices, dtype=numpy.int64)
+        world = self.world
+        meltDensity = world.continentCrustDensity
+        density = self.density.ravel()[indices]
+        thickness = self.getThickness(indices)
+        elevation = self.getElevation(indices)
+        depth = numpy.abs(elevation)
+        underwater = elevation < 0
+
+        thickness = numpy.where(underwater,
+                                thickness - ((meltDensity - world.waterDensity)
+                                             / (density - meltDensity))
+                                * depth,
+                                thickness)
+        height = thickness * ((density - meltDensity) / meltDensity)
+        heightChange = numpy.where(underwater, height + depth, height)
+        pressure = (thickness * density) + (heightChange * density)
+
+        self.thickness.ravel()[indices] += heightChange
+        self.density.ravel()[indices] = pressure / (thickness + heightChange)
+        events = world.events
+        if events is not None:
+            events.emit('eruption', self.getCartesians()[indices],
+                        indices // self.cellNum, -1, heightChange)
@@ -0,0 +1,118 @@
+"""Running many worlds at once across a pool of processes.
+
+Each run is a dictionary of arguments to World (a seed among them),
+which every worker builds its own world from, so runs depend upon nothing
+but their arguments. Runs return summary statistics of their world,
+and optionally write a checkpoint of it to a directory.
+
+    runs = getRuns(range(16), plateNum=[7, 14])
+    results = runEnsemble(runs, steps=100, processes=4)
+
+"""
+
+import itertools
+import os
+import time
+from multiprocessing import Pool
+
+import numpy
+
+from pytectonics.world import World
+
+# arguments given to World where a run doesn't give its own
+defaults = {'radius': 6367, 'resolution': 360 / 10, 'plateNum': 7,
+            'continentNum': 3, 'continentSize': 1250}
+
+
+def getRuns(seeds, **parameters):
+    """Returns a run for every combination of seed and parameters,
+    where each parameter may be given a single value or a list of them
+
+    """
+    names = sorted(parameters)
+    values = [value if isinstance(value, (list, tuple)) else [value]
+              for value in (parameters[name] for name in names)]
+    return [dict(zip(names, combination), seed=seed)
+            for combination in itertools.product(*values)
+            for seed in seeds]
+
+
+def getSummary(world):
+    """Returns summary statistics of the crust of a world"""
+    store = world.crustStore
+    mask = store.occupied & store.active[:, None]
+    elevation = store.getElevation()[mask]
+    thickness = store.getThickness()[mask]
+    return {'age': world.age,
+            'plates': len(world.plates),
+            'crust': int(mask.sum()),
+            'continent': float(store.isContinent()[mask].mean()),
+            'land': float((elevation > 0).mean()),
+            'elevationMean': float(elevation.mean()),
+            'elevationMin': float(elevation.min()),
+            'elevationMax': float(elevation.max()),
+            'thicknessMean': float(thickness.mean())}
+
+
+def runWorld(run, steps, timestep=1.0, snapshots=None, index=0):
+    """Builds the world of a run and updates it steps times,
+    returning its summary. A run may give its own steps and timestep.
+
+    """
+    arguments = dict(defaults)
+    arguments.update(run)
+    steps = arguments.pop('steps', steps)
+    timestep = arguments.pop('timestep', timestep)
+    start = time.perf_counter()
+    world = World(**arguments)
+    for i in range(steps):
+        world.update(timestep)
+    result = {'run': run,
+              'steps': steps,
+              'seconds': time.perf_counter() - start,
+              'summary': getSummary(world),
+              'snapshot': None}
+    if snapshots:
+        result['snapshot'] = os.path.join(snapshots, 'run%d.npz' % index)
+        world.save(result['snapshot'])
+    return result
+
+
+def _runWorld(arguments):
+    return runWorld(*arguments)
+
+
+def summarize(results):
+    """Returns the mean, standard deviation, minimum and maximum
+    of each summary statistic across the results of an ensemble
+
+    """
+    statistics = {}
+    for name in results[0]['summary'] if results else []:
+        values = numpy.array([result['summary'][name] for result in results],
+                             dtype=float)
+        statistics[name] = {'mean': float(values.mean()),
+                            'std': float(values.std()),
+                            'min': float(values.min()),
+                            'max': float(values.max())}
+    return statistics
+
+
+def runEnsemble(runs, steps, timestep=1.0, processes=None, snapshots=None):
+    """Runs every run for at most steps updates across a pool of processes,
+    by default one per cpu, or in this process if processes is 1.
+    Returns the results of the runs, in the order given, and their summary.
+    If snapshots names a directory, the final world of each run
+    is saved there as a checkpoint.
+
+    """
+    if snapshots and not os.path.isdir(snapshots):
+        os.makedirs(snapshots)
+    jobs = [(run, steps, timestep, snapshots, index)
+            for index, run in enumerate(runs)]
+    if processes == 1:
+        results = [_runWorld(job) for job in jobs]
+    else:
+        with Pool(processes) as pool:
+            results = pool.map(_runWorld, jobs)
+    return {'runs': results, 'summary': summarize(results)}
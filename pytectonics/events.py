@@ -0,0 +1,154 @@
+"""A stream of the tectonic events of World.update.
+
+Set world.events to an EventStream and subscribe to it to start recording.
+While world.events is None, update runs exactly as it otherwise would,
+and each place an event occurs costs a single attribute test. Nor does
+an EventStream record anything while nothing subscribes to it.
+
+Events are records of the numpy dtype record, gathered over a step and
+delivered to every subscription at its end as one array:
+
+    world.events = EventStream()
+    subscription = world.events.subscribe()
+    for i in range(100):
+        world.update(1.0)
+    for event in subscription:
+        print(types[event['type']], event['age'], event['lat'], event['lon'])
+
+"""
+
+import numpy
+
+from pytectonics.utils import toSphericalArray
+
+# the types of event, each record holding the index of its type.
+# plate and other are the plate indices an event involves, magnitude is
+# subduction: crust of plate first subducted by crust of other,
+#             the thickness of the subducted crust
+# eruption: a volcano erupted upon crust of plate, its change in height
+# dockRequest: continental crust of plate asked to dock to other,
+#              the number of crust docking
+# docked: crust of other docked to plate, the thickness of the crust
+# overwritten: crust of plate was replaced by crust of other docking to it,
+#              for want of an empty cell, the thickness of the crust replaced
+# plateDestroyed: plate was destroyed, the number of crust it held
+# dockingOverwritten: as overwritten, where the crust replaced
+#                     was itself waiting to dock
+types = ['subduction', 'eruption', 'dockRequest', 'docked', 'overwritten',
+         'plateDestroyed', 'dockingOverwritten']
+
+record = numpy.dtype([('type', numpy.int8),
+                      ('step', numpy.int64),
+                      ('age', numpy.float64),
+                      ('lat', numpy.float64),
+                      ('lon', numpy.float64),
+                      ('plate', numpy.int32),
+                      ('other', numpy.int32),
+                      ('magnitude', numpy.float64)])
+
+_codes = {name: code for code, name in enumerate(types)}
+
+
+class Subscription:
+    """A bounded ring buffer of the events delivered to it.
+    Once full, the oldest events are overwritten, and counted in dropped.
+    If a callback is given, it is also called with the events
+    of each step as they are delivered.
+
+    """
+
+    def __init__(self, size=65536, callback=None):
+        self.size = size
+        self.callback = callback
+        self.dropped = 0
+        self._buffer = numpy.zeros(size, dtype=record)
+        self._start = 0
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def push(self, records):
+        if self.callback is not None:
+            self.callback(records)
+        if len(records) > self.size:
+            self.dropped += len(records) - self.size
+            records = records[len(records) - self.size:]
+        overflow = max(self._count + len(records) - self.size, 0)
+        self.dropped += overflow
+        self._start = (self._start + overflow) % self.size
+        self._count -= overflow
+        end = (self._start + self._count) % self.size
+        first = min(len(records), self.size - end)
+        self._buffer[end:end + first] = records[:first]
+        self._buffer[:len(records) - first] = records[first:]
+        self._count += len(records)
+
+    def read(self):
+        """Returns every event not yet read, oldest first, as an array"""
+        indices = (self._start + numpy.arange(self._count)) % self.size
+        records = self._buffer[indices]
+        self._start = (self._start + self._count) % self.size
+        self._count = 0
+        return records
+
+    def __iter__(self):
+        """Yields every event not yet read, oldest first"""
+        for event in self.read():
+            yield event
+
+
+class EventStream:
+    """Gathers the events of each step of a world, delivering them
+    to subscriptions once the step ends
+
+    """
+
+    def __init__(self):
+        self.subscriptions = []
+        # number of steps ended since the stream was made
+        self.step = 0
+        self._pending = []
+
+    def subscribe(self, size=65536, callback=None):
+        """Returns a new Subscription to every event from now on"""
+        subscription = Subscription(size, callback)
+        self.subscriptions.append(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        self.subscriptions.remove(subscription)
+
+    def emit(self, type, cartesians, plates, others=-1, magnitudes=0.0):
+        """Records events of a type at world positions cartesians,
+        given as one position or an (N,3) array of them.
+        plates, others and magnitudes may each be given once
+        or once per event.
+
+        """
+        if not self.subscriptions:
+            return
+        cartesians = numpy.asarray(cartesians, dtype=float).reshape(-1, 3)
+        if not len(cartesians):
+            return
+        records = numpy.zeros(len(cartesians), dtype=record)
+        records['type'] = _codes[type]
+        records['lat'], records['lon'] = toSphericalArray(cartesians)
+        records['plate'] = plates
+        records['other'] = others
+        records['magnitude'] = magnitudes
+        self._pending.append(records)
+
+    def endStep(self, world):
+        """Delivers the events of the step just ended, stamped with
+        the step and the age of world it ended at
+
+        """
+        if self._pending:
+            records = numpy.concatenate(self._pending)
+            self._pending = []
+            records['step'] = self.step
+            records['age'] = world.age
+            for subscription in self.subscriptions:
+                subscription.push(records)
+        self.step += 1
@@ -0,0 +1,198 @@
+"""Streaming per cell fields of a World to disk as it updates.
+
+Fields are sampled upon the cells of the world's template grid, which never
+moves, so every timestep in a stream lines up with every other.
+A stream is two files: the data file, an append only series of records,
+one compressed .npz per timestep, and an index file holding the age, offset
+and size of each record, so a single timestep can be read with one seek.
+
+"""
+
+import io
+import threading
+import numpy
+from queue import Queue
+
+fields = ['elevation', 'thickness', 'density', 'plate', 'continent']
+
+index = numpy.dtype([('age', '<f8'), ('offset', '<i8'), ('size', '<i8')])
+
+
+def getIndexPath(path):
+    return path + '.index'
+
+
+def getTopIndices(world):
+    """Returns, for each cell of the template grid, the flat store index
+    of the crust on top there, and a mask of cells any crust covers.
+    Where plates overlap a cell, crust that isn't subducted is on top
+    of crust that is, then the highest crust.
+
+    """
+    store = world.crustStore
+    ownership = world.ownership
+    if not ownership.built:
+        ownership.rebuild()
+    plates = numpy.flatnonzero(store.active)
+    cells = ownership.cells[:, plates]
+    covered = cells >= 0
+    flat = plates * store.cellNum + numpy.maximum(cells, 0)
+
+    found = covered.any(axis=1)
+    exposed = covered & ~store.isSubducted(flat)
+    candidates = numpy.where(exposed.any(axis=1)[:, None], exposed, covered)
+    top = numpy.argmax(numpy.where(candidates,
+                                   store.displacement.ravel()[flat],
+                                   -numpy.inf), axis=1)
+    return flat[numpy.arange(len(flat)), top], found
+
+
+def getField(world, name, top, found):
+    """Returns the field called name of the crust at flat store indices top,
+    nan (or -1 for plate) where found is not set
+
+    """
+    store = world.crustStore
+    if name == 'elevation':
+        values = store.getElevation(top)
+    elif name == 'thickness':
+        values = store.getThickness(top)
+    elif name == 'density':
+        values = store.density.ravel()[top]
+    elif name == 'plate':
+        values = numpy.where(found, top // store.cellNum, -1)
+    elif name == 'continent':
+        values = store.isContinent(top) & found
+    else:
+        raise ValueError('unknown field %s' % name)
+    if values.dtype.kind == 'f':
+        values = numpy.where(found, values, numpy.nan)
+    return values
+
+
+def sampleFields(world, names=fields):
+    """Returns a dictionary of arrays over the cells of the template grid
+    of the crust on top in each cell, see getTopIndices.
+    Cells no crust covers hold nan, or -1 for plate.
+
+    """
+    top, found = getTopIndices(world)
+    return {name: getField(world, name, top, found) for name in names}
+
+
+class FieldWriter:
+    """A stage of World.update that appends sampled fields to a stream
+    every cadence updates.
+    Fields are sampled on the updating thread, which only takes a copy of
+    a few arrays. Compressing and writing them happens on a background
+    thread, behind a queue of at most queueSize timesteps, so stepping only
+    waits on the disk if the writer falls a whole queue behind.
+
+    """
+
+    def __init__(self, path, names=fields, cadence=1, queueSize=8,
+                 compress=True):
+        self.path = path
+        self.names = list(names)
+        self.cadence = cadence
+        self.compress = compress
+        self.step = 0
+        self.error = None
+        self._queue = Queue(queueSize)
+        self._data = open(path, 'ab')
+        self._index = open(getIndexPath(path), 'ab')
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def update(self, world):
+        self.step += 1
+        if self.step % self.cadence == 0:
+            self.write(world)
+
+    def write(self, world):
+        """Queues the current fields of world for writing"""
+        if self.error:
+            raise self.error
+        self._queue.put((world.age, sampleFields(world, self.names)))
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            if self.error:
+                continue
+            try:
+                self._append(*item)
+            except Exception as error:
+                self.error = error
+
+    def _append(self, age, sampled):
+        record = io.BytesIO()
+        if self.compress:
+            numpy.savez_compressed(record, **sampled)
+        else:
+            numpy.savez(record, **sampled)
+        record = record.getvalue()
+        offset = self._data.tell()
+        self._data.write(record)
+        self._data.flush()
+        entry = numpy.array([(age, offset, len(record))], dtype=index)
+        self._index.write(entry.tobytes())
+        self._index.flush()
+
+    def close(self):
+        """Writes out every queued timestep and closes the stream"""
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+        self._data.close()
+        self._index.close()
+        if self.error:
+            raise self.error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class FieldReader:
+    """Reads timesteps back out of a stream written by FieldWriter.
+    Only the index is read up front, each timestep is read on demand.
+
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.index = numpy.fromfile(getIndexPath(path), dtype=index)
+
+    def __len__(self):
+        return len(self.index)
+
+    def _getAges(self):
+        return self.index['age']
+
+    ages = property(_getAges)
+
+    def __getitem__(self, timestep):
+        """Returns a dictionary of the fields of the nth timestep written"""
+        entry = self.index[timestep]
+        with open(self.path, 'rb') as data:
+            data.seek(entry['offset'])
+            record = data.read(entry['size'])
+        with numpy.load(io.BytesIO(record)) as sampled:
+            return dict(sampled.items())
+
+    def __iter__(self):
+        for timestep in range(len(self)):
+            yield self[timestep]
+
+    def getAt(self, age):
+        """Returns the fields of the last timestep written at or before age"""
+        timestep = numpy.searchsorted(self.ages, age, side='right') - 1
+        if timestep < 0:
+            raise IndexError('no timestep at or before age %s' % age)
+        return self[timestep]
@@ -3,21 +3,47 @@ from pytectonics.utils import toSpherical, toCartesian
 from numpy import asarray, sqrt, dot, cos, sin, array
 
 
-class GeoCoordinate:
+class GeoPoint:
+    """A point upon the globe, given by the spherical and cartesian
+    properties of subclasses. Holds no state of its own, so subclasses
+    that find their position elsewhere, as crust does, carry no slots
+    they don't use.
+
+    """
+
+    __slots__ = ()
+
+    def __getitem__(self, key):
+        return self.spherical[key]
+
+    def getArcDistance(self, other):
+        """Returns distance between two points on a globe given in terms of distance.
+        Correctly considers the curvature of the globe."""
+        lat1, lon1 = self
+        lat2, lon2 = other
+        latChange = abs(lat1 - lat2)
+        lonChange = abs(lon1 - lon2)
+        return 2 * asin(sqrt(sin(latChange / 2) ** 2 + \
+                             cos(lat1) * cos(lat2) * sin(lonChange / 2) ** 2))
+
+    def getDistance(self, other):
+        """Returns distance between two points """
+        x = self.cartesian - other
+        return sqrt(x.dot(x))
+
+
+class GeoCoordinate(GeoPoint):
     _idCounter = 0
 
+    # slotted, as there is one for every plate and grid point
+    __slots__ = ('_spherical', '_cartesian', 'id')
+
     def __init__(self, spherical=None, id=None, cartesian=None):
         self._spherical = spherical
         self._cartesian = cartesian
         self.id = id
         GeoCoordinate._idCounter += 1
 
-    def __getitem__(self, key):
-        return self._getSpherical()[key]
-
-    def __dict__(self):
-        return self.id
-
     def _getSpherical(self):
         if not self._spherical:
             self._spherical = toSpherical(self._cartesian)
@@ -40,21 +66,6 @@ class GeoCoordinate:
 
     cartesian = property(_getCartesian, _setCartesian)
 
-    def getArcDistance(self, other):
-        """Returns distance between two points on a globe given in terms of distance.
-        Correctly considers the curvature of the globe."""
-        lat1, lon1 = self
-        lat2, lon2 = other
-        latChange = abs(lat1 - lat2)
-        lonChange = abs(lon1 - lon2)
-        return 2 * asin(sqrt(sin(latChange / 2) ** 2 + \
-                             cos(lat1) * cos(lat2) * sin(lonChange / 2) ** 2))
-
-    def getDistance(self, other):
-        """Returns distance between two points """
-        x = self.cartesian - other
-        return sqrt(x.dot(x))
-
     def rotate(self, angularSpeed, eulerPole, inPlace=True):
         def rotation_matrix(axis, theta):
             """
@@ -21,6 +21,18 @@ class CartesianArray:
         j = float(j) / self.numLon * CIRCLE
         return i, j
 
+    def getPositions(self):
+        """Returns the lat and lon of every cell as two arrays
+        shaped like self.array, computed the same way as idToPos
+
+        """
+        i, j = numpy.meshgrid(numpy.arange(self.numLat, dtype=float),
+                              numpy.arange(self.numLon, dtype=float),
+                              indexing='ij')
+        lat = i / self.numLat * SEMICIRCLE - RIGHT_ANGLE
+        lon = j / self.numLon * CIRCLE
+        return lat, lon
+
     def posToId(self, coord):
         lat, lon = coord
         lon = lon + CIRCLE if lon < 0 else lon
@@ -30,6 +42,20 @@ class CartesianArray:
         j = bound(j, 0, self.numLon - 1)
         return i, j
 
+    def posToIds(self, lat, lon):
+        """Vectorized posToId, takes arrays of lat and lon
+        and returns arrays of row and column indices
+
+        """
+        lat = numpy.asarray(lat)
+        lon = numpy.asarray(lon)
+        lon = numpy.where(lon < 0, lon + CIRCLE, lon)
+        i = numpy.round((lat + RIGHT_ANGLE) / SEMICIRCLE * self.numLat)
+        i = numpy.clip(i, 0, self.numLat - 1).astype(int)
+        j = numpy.round(lon / CIRCLE * self.numLon)
+        j = numpy.clip(j, 0, self.numLon - 1).astype(int)
+        return i, j
+
     def getIds(self):
         for i in range(self.numLat):
             for j in range(self.numLon):
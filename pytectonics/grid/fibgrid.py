@@ -1,6 +1,7 @@
 from math import log, sqrt, pi, sin, cos, asin
+import numpy
 from .cartesianarray import CartesianArray
-from pytectonics.utils import CIRCLE, SEMICIRCLE, sqrt5, phi, getLonDistance, fib, bound, toCartesian, toSpherical
+from pytectonics.utils import CIRCLE, SEMICIRCLE, sqrt5, phi, getLonDistance, fib, bound, toCartesian, toSpherical, toSphericalArray
 from .myframe import MyFrame
 
 
@@ -35,7 +36,8 @@ class FibGrid:
         return int(pointNum)
 
     #---MAGIC METHODS
-    def __init__(self, avgDistance, mapping=None):
+    def __init__(self, avgDistance, mapping=None, neighbors=None,
+                 reverseNeighbors=None, points=None):
         self.avgDistance = avgDistance
         self.pointNum = FibGrid.getPointNum(avgDistance)
         self.totalPointNum = 2*self.pointNum+1
@@ -47,17 +49,37 @@ class FibGrid:
         if not mapping:
             mapping = CartesianArray(SEMICIRCLE / avgDistance * self.resolution,
                                      CIRCLE / avgDistance * self.resolution)
-            for i, j in mapping.getIds():
-                lat, lon = mapping.idToPos((i, j))
-                mapping.array[i, j] = self._getIndex((lat, lon))
+            mapping.array[:] = self._getIndexArray(*mapping.getPositions())
         self.mapping = mapping
+
+        if neighbors is None:
+            neighbors = self._getNeighborTable()
+        self.neighbors = neighbors
+        if reverseNeighbors is None:
+            reverseNeighbors = self._getReverseNeighborTable()
+        self.reverseNeighbors = reverseNeighbors
                 
         self.frame = MyFrame()
+        self._cartesians = None
+        self._cartesiansVersion = None
         
-        self.points = [None for i in range(0, self.totalPointNum)]
-        for i in self.getIndices():
-            self.points[i] = toCartesian(self._getSpherical(i))
+        # position of each cell in the grid's own frame, as an (N,3) array
+        # laid out as coverage is
+        if points is None:
+            points = self._getPointArray()
+        self.points = points
             
+    def getSharedGrid(self):
+        """Returns a new, empty grid of the same cells as this one,
+        sharing its mapping, neighbor tables and points read only.
+        Only the coverage and frame of the new grid are its own.
+
+        """
+        return type(self)(self.avgDistance, mapping=self.mapping,
+                          neighbors=self.neighbors,
+                          reverseNeighbors=self.reverseNeighbors,
+                          points=self.points)
+
     def __iter__(self):
         for cell in self.coverage:
             if cell: yield cell
@@ -96,6 +118,23 @@ class FibGrid:
         spherical = toSpherical(cart_world_to_frame)
         return int(self.mapping.array[self.mapping.posToId(spherical)])
 
+    def getCartesianIndices(self, cartesians, frame=None):
+        """Batched getCartesianIndex.
+        Takes an (N,3) array of world positions and
+        returns an int array of the indices of the cells they fall in.
+        frame, by default the grid's own, is the frame the grid is taken
+        to be in, so grids sharing a mapping can be looked up through one.
+
+        """
+        cartesians = numpy.asarray(cartesians, dtype=float)
+        if not len(cartesians):
+            return numpy.zeros(0, dtype=int)
+        if frame is None:
+            frame = self.frame
+        lat, lon = toSphericalArray(frame.world_to_frame_array(cartesians))
+        return self.mapping.array[self.mapping.posToIds(lat, lon)] \
+            .astype(int)
+
     def _getIndex(self, coord):
         """Returns the approximate index of the coordinates given.
         The position of the index appears to always be at least 
@@ -131,6 +170,33 @@ class FibGrid:
         index = int(bound(index, -self.pointNum+1, self.pointNum))
         return index
     
+    def _getIndexArray(self, lat, lon):
+        """Vectorized equivalent of _getIndex.
+        Takes arrays of lat and lon and returns an array of the indices
+        _getIndex would return for each pair, using the same operations
+        in the same order so that both agree exactly.
+
+        """
+        lat = numpy.asarray(lat, dtype=float)
+        lon = numpy.asarray(lon, dtype=float)
+        index = numpy.round(numpy.sin(lat) / self.zIncrement)
+        zone = numpy.round(numpy.log(self.totalPointNum *
+                                     pi * sqrt5 * numpy.cos(lat)**2)
+                           / log(phi) / 2.0).astype(int)
+
+        # the phinary expansion is run for every cell at once,
+        # cells drop out once they pass the search depth of their zone
+        depth = numpy.abs(zone+1)
+        remainder = ((index*CIRCLE/phi) % CIRCLE - lon + CIRCLE) % CIRCLE
+        remainder = remainder / CIRCLE
+        for k in range(1, int(depth.max()) if depth.size else 0):
+            active = k < depth
+            remaindertemp = remainder*phi
+            remainder = numpy.where(active, remaindertemp % 1.0, remainder)
+            index += numpy.where(active & (numpy.abs(remaindertemp) > 1.0),
+                                 (-1)**k*fib(k), 0)
+        return numpy.clip(index, -self.pointNum+1, self.pointNum)
+
     # ---GET COORDINATE FUNCTIONS
     def _getZ(self, index):
         return bound(index * self.zIncrement, -1.0, 1.0)
@@ -143,11 +209,34 @@ class FibGrid:
                 max(index, -self.pointNum)
         return asin(self._getZ(index)), self._getLon(index)
 
+    def _getPointArray(self):
+        """Returns the position of every cell in the grid's own frame,
+        each computed exactly as toCartesian would, as a read only array
+
+        """
+        points = numpy.array([toCartesian(self._getSpherical(i))
+                              for i in self.getIndicesAt(
+                                  range(self.totalPointNum))])
+        points.flags.writeable = False
+        return points
+
     def getSpherical(self, index):
         return toSpherical(self.getCartesian(index))
 
     def getCartesian(self, index):
-        return self.frame.frame_to_world(self.points[index])
+        return self.getCartesians()[index]
+
+    def getCartesians(self):
+        """Returns the world positions of every cell as an (N,3) array.
+        Positions are computed for the whole grid in one pass
+        and are reused until the frame is next rotated.
+
+        """
+        if self._cartesiansVersion != self.frame.version:
+            self._cartesians = self.frame.frame_to_world_array(self.points)
+            self._cartesians.flags.writeable = False
+            self._cartesiansVersion = self.frame.version
+        return self._cartesians
 
     # ---COLLECTION METHODS
     def add(self, point):
@@ -163,18 +252,106 @@ class FibGrid:
     def _getCellNeighborId(self, index, sign, zone):
         return bound(index + sign*fib(zone), -self.pointNum, self.pointNum)
 
+    def _getNeighborTable(self):
+        """Returns an (N,6) array of the indices of cells neighboring each cell,
+        laid out so that neighbors[index] gives the neighbors of index,
+        negative indices wrapping around as they do for coverage.
+        Each row holds the same indices, in the same order,
+        as _getCellNeighborId would give for zones -1, 0 and 1
+        on either side of the cell.
+        The table only depends upon the number of cells, so it is
+        computed once per template and shared by every grid.
+
+        """
+        position = numpy.arange(self.totalPointNum)
+        index = numpy.where(position > self.pointNum,
+                            position - self.totalPointNum, position)
+        lat = numpy.arcsin(numpy.clip(index * self.zIncrement, -1.0, 1.0))
+        zone = numpy.round(numpy.log(self.totalPointNum *
+                                     pi * sqrt5 * numpy.cos(lat)**2)
+                           / log(phi) / 2.0).astype(int)
+
+        # fib() is looked up rather than vectorized so rounding matches it
+        offset = zone.min() - 1
+        fibs = numpy.array([fib(k) for k in range(offset, zone.max() + 2)])
+        neighbors = numpy.empty((self.totalPointNum, 6), dtype=numpy.int32)
+        for column, (sign, zoneChange) in enumerate(
+                [(-1, -1), (-1, 0), (-1, 1), (1, -1), (1, 0), (1, 1)]):
+            neighbors[:, column] = numpy.clip(
+                index + sign*fibs[zone + zoneChange - offset],
+                -self.pointNum, self.pointNum)
+        neighbors.flags.writeable = False
+        return neighbors
+
+    def _getReverseNeighborTable(self):
+        """Returns an array whose rows list the cells that have each cell
+        as a neighbor. Neighborhoods are not quite symmetric, so this differs
+        from the neighbor table. Rows are padded with the cell itself.
+
+        """
+        cells = numpy.repeat(numpy.arange(self.totalPointNum), 6)
+        neighbors = self.neighbors.ravel() % self.totalPointNum
+        order = numpy.argsort(neighbors, kind='mergesort')
+        cells, neighbors = cells[order], neighbors[order]
+        counts = numpy.bincount(neighbors, minlength=self.totalPointNum)
+        starts = numpy.cumsum(counts) - counts
+        table = numpy.repeat(numpy.arange(self.totalPointNum, dtype=numpy.int32)
+                             [:, None], counts.max(), axis=1)
+        table[neighbors, numpy.arange(len(neighbors)) - starts[neighbors]] = \
+            cells
+        table.flags.writeable = False
+        return table
+
+    def getIndicesAt(self, positions):
+        """Returns the indices of cells at positions within coverage,
+        the inverse of the wrap around of negative indices
+
+        """
+        positions = numpy.asarray(positions)
+        return numpy.where(positions > self.pointNum,
+                           positions - self.totalPointNum, positions)
+
+    def getComponentLabels(self, mask):
+        """Labels the connected components of a mask over the cells of the grid.
+        Cells are connected where either lists the other as a neighbor.
+        Returns an array holding, for each cell within the mask, the lowest
+        position within its component, and -1 elsewhere.
+        Each pass hooks every component onto the lowest labelled component
+        it touches, then shortcuts chains of labels, so few passes are needed
+        however large the components grow.
+
+        """
+        mask = numpy.asarray(mask, dtype=bool)
+        cells = numpy.repeat(numpy.arange(self.totalPointNum), 6)
+        neighbors = self.neighbors.ravel() % self.totalPointNum
+        inside = mask[cells] & mask[neighbors]
+        cells, neighbors = cells[inside], neighbors[inside]
+
+        labels = numpy.arange(self.totalPointNum)
+        while True:
+            cellLabels, neighborLabels = labels[cells], labels[neighbors]
+            hooked = labels.copy()
+            numpy.minimum.at(hooked,
+                             numpy.maximum(cellLabels, neighborLabels),
+                             numpy.minimum(cellLabels, neighborLabels))
+            while True:
+                shortcut = hooked[hooked]
+                if numpy.array_equal(shortcut, hooked):
+                    break
+                hooked = shortcut
+            if numpy.array_equal(hooked, labels):
+                break
+            labels = hooked
+        return numpy.where(mask, labels, -1)
+
     def getCellNeighborIds(self, index, zones=[-1, 0, 1]):
         """Returns indices of cells neighboring the one specified by the given index.
-        This is a frequently used function that is highly optimized.
+        This is a frequently used function that is highly optimized,
+        neighbors are read from the precomputed neighbor table.
+        Use the table directly to gather neighbors of many cells at once.
 
         """
-        zone = self._getZone(asin(self._getZ(index)))
-        yield self._getCellNeighborId(index, -1, zone-1)
-        yield self._getCellNeighborId(index, -1, zone)
-        yield self._getCellNeighborId(index, -1, zone+1)
-        yield self._getCellNeighborId(index,  1, zone-1)
-        yield self._getCellNeighborId(index,  1, zone)
-        yield self._getCellNeighborId(index,  1, zone+1)
+        return self.neighbors[index].tolist()
 
     def _getCellNeighbors(self, index):
         """Returns points occupying cells neighboring the cell specified by
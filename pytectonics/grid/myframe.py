@@ -13,21 +13,55 @@ class MyFrame:
     """
 
     def __init__(self):
+        self.version = 0
         self.axis = array([1, 0, 0])
         self.pos = array([0, 0, 0])
         self.up = array([0, 1, 0])
 
+    def _getAxis(self):
+        return self._axis
+
+    def _setAxis(self, axis):
+        self._axis = axis
+        self._matrix = None
+        self.version += 1
+
+    axis = property(_getAxis, _setAxis)
+
+    def getMatrix(self):
+        """Returns the orientation of the frame as a 3x3 matrix
+        whose rows are the x, y and z axes of the frame in world coordinates.
+        The matrix is cached until the axis of the frame changes,
+        version is incremented whenever that happens.
+
+        """
+        if self._matrix is None:
+            z = array([0, 0, self.world_zaxis()])
+            part = cross(z, self.axis)
+            y = part / sqrt(dot(part, part))
+            x = self.axis / sqrt(dot(self.axis, self.axis))
+            self._matrix = array([x, y, z])
+            self._matrix.flags.writeable = False
+        return self._matrix
+
     def frame_to_world(self, a):
         """ this is being used on line 150, in getCartesian so it needs to
         be implemented
 
         """
-        z = array([0, 0, self.world_zaxis()])
-        part = cross(z, self.axis)
-        y = part / sqrt(dot(part, part))
-        x = self.axis / sqrt(dot(self.axis, self.axis))
+        x, y, z = self.getMatrix()
         return self.pos + a[0]*x + a[1] * y + a[2] * z
 
+    def frame_to_world_array(self, a):
+        """Batched frame_to_world over an (N,3) array of points.
+        The product with the matrix is written out term by term
+        so every point rounds exactly as it would in frame_to_world.
+
+        """
+        a = asarray(a)
+        x, y, z = self.getMatrix()
+        return self.pos + a[:, 0:1]*x + a[:, 1:2] * y + a[:, 2:3] * z
+
     def world_zaxis(self):
         if dot(self.axis, self.up) / sqrt(mag(self.up) * mag(self.axis)) > 0.98:
             if dot(mag(self.axis), array([-1, 0, 0])) > 0.98:
@@ -39,12 +73,20 @@ class MyFrame:
         return z
 
     def world_to_frame(self, a):
-        z = array([0, 0, self.world_zaxis()])
-        part = cross(z, self.axis)
-        y = part / sqrt(dot(part, part))
-        x = self.axis / sqrt(dot(self.axis, self.axis))
+        matrix = self.getMatrix()
         v = a - self.pos
-        return dot(v, x), dot(v, y), dot(v, z)
+        x, y, z = v[0]*matrix[:, 0] + v[1]*matrix[:, 1] + v[2]*matrix[:, 2]
+        return x, y, z
+
+    def world_to_frame_array(self, a):
+        """Batched world_to_frame over an (N,3) array of points,
+        returns an (N,3) array rounding exactly as world_to_frame does
+
+        """
+        matrix = self.getMatrix()
+        v = asarray(a) - self.pos
+        return v[:, 0:1]*matrix[:, 0] + v[:, 1:2]*matrix[:, 1] + \
+            v[:, 2:3]*matrix[:, 2]
 
     def rotate(self, *args, **kwargs):
         def rotation_matrix(axis, theta):
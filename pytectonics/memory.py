@@ -0,0 +1,138 @@
+"""Reports of the memory held by a World.
+
+Sizes are those of the objects a part of the world owns outright: numpy
+arrays by their buffers, python objects by sys.getsizeof, along with the
+tuples and numbers held in their attributes. Objects shared between parts,
+such as the neighbor tables every grid takes from the template,
+are counted once, under whichever owns them.
+
+    report = getReport(world)
+    assert report['bytesPerCrust'] <= budget
+
+Run as a script, checks that budget holds on a seeded world:
+
+    python -m pytectonics.memory --resolution 72 --steps 10
+
+"""
+
+import argparse
+import sys
+
+from pytectonics.world import World
+
+# bytes a crust may hold, its slots and the numbers in them
+budget = 120
+
+
+def getObjectSize(obj):
+    """Returns the bytes held by a python object itself: the instance,
+    its attribute dictionary if it has one, and the tuples and numbers
+    among its attributes. Other objects it refers to aren't counted.
+
+    """
+    size = sys.getsizeof(obj)
+    values = []
+    if hasattr(obj, '__dict__'):
+        size += sys.getsizeof(obj.__dict__)
+        values.extend(obj.__dict__.values())
+    for cls in type(obj).__mro__:
+        for name in cls.__dict__.get('__slots__', ()):
+            # the slot itself, which a subclass may hide behind a property
+            try:
+                values.append(cls.__dict__[name].__get__(obj, cls))
+            except AttributeError:
+                pass
+    for value in values:
+        if isinstance(value, (tuple, int, float)):
+            size += sys.getsizeof(value)
+            if isinstance(value, tuple):
+                size += sum(sys.getsizeof(item) for item in value)
+    return size
+
+
+def getArraySize(*arrays):
+    return sum(array.nbytes for array in arrays)
+
+
+def getGridSize(grid, shared=True):
+    """Returns the bytes held by a grid, including the mapping,
+    neighbor tables and points it shares with other grids
+    only if shared is set
+
+    """
+    size = getObjectSize(grid) + sys.getsizeof(grid.coverage)
+    if grid._cartesians is not None:
+        size += grid._cartesians.nbytes
+    if shared:
+        size += getArraySize(grid.mapping.array, grid.neighbors,
+                             grid.reverseNeighbors, grid.points)
+    return size
+
+
+def getPlateSize(plate):
+    """Returns the bytes held by a plate and its grid, less the crust
+    upon it and what its grid shares with the template
+
+    """
+    return getObjectSize(plate) + getGridSize(plate.grid, shared=False) + \
+        getArraySize(plate._collidable, plate._riftable, plate._partners,
+                     plate._stamps) + \
+        (getArraySize(plate._groupMask, plate._groupLabels)
+         if plate._groupMask is not None else 0) + \
+        sys.getsizeof(plate._changed) + sys.getsizeof(plate._docking)
+
+
+def getReport(world):
+    """Returns the bytes held by each part of a world, in total,
+    and per crust and per plate
+
+    """
+    store = world.crustStore
+    ownership = world.ownership
+    crusts = [crust for plate in store.plates for crust in plate.grid]
+    report = {
+        'crusts': len(crusts),
+        'plates': len(store.plates),
+        'crust': sum(getObjectSize(crust) for crust in crusts),
+        'plate': sum(getPlateSize(plate) for plate in store.plates),
+        'store': getArraySize(store.active, *[getattr(store, name)
+                                              for name in store.columns]),
+        'ownership': getArraySize(ownership.local, ownership.cells,
+                                  ownership.references, ownership.starts,
+                                  ownership.reach),
+        'template': getGridSize(world.template),
+    }
+    report['total'] = sum(report[name] for name in
+                          ['crust', 'plate', 'store', 'ownership', 'template'])
+    report['bytesPerCrust'] = report['crust'] / max(report['crusts'], 1)
+    report['bytesPerPlate'] = report['plate'] / max(report['plates'], 1)
+    # what each cell of the world costs, wherever it is held
+    report['bytesPerCell'] = report['total'] / world.template.totalPointNum
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--resolution', type=float, default=36)
+    parser.add_argument('--plates', type=int, default=7)
+    parser.add_argument('--steps', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    world = World(radius=6367, resolution=args.resolution,
+                  plateNum=args.plates, continentNum=3, continentSize=1250,
+                  seed=args.seed)
+    for i in range(args.steps):
+        world.update(1.0)
+    report = getReport(world)
+    for name, size in report.items():
+        print('%s: %d' % (name, size))
+    if report['bytesPerCrust'] > budget:
+        print('%d bytes per crust exceeds the budget of %d'
+              % (report['bytesPerCrust'], budget))
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,136 @@
+import numpy
+
+
+class OwnershipIndex:
+    """World level spatial index over the cells of a reference grid.
+    The reference grid is the template FibGrid, whose frame never moves.
+    For each reference cell the index records which cell of every plate
+    lies beneath it, which crust (if any) occupies that cell, and whether
+    the plate reaches the reference cell closely enough to collide there.
+    Finding the plates near a point then no longer depends upon
+    how many plates there are.
+    The index is rebuilt once per update, after plates move, and is kept
+    up to date as crust is added. Removed crust is left in the reach of its
+    plate until the next rebuild, which only ever costs an extra narrow test.
+
+    """
+
+    def __init__(self, world, template, margin=3):
+        """margin is the number of rings of reference cells reach is grown by,
+        covering the error of the approximate index lookups on either side
+
+        """
+        self.world = world
+        self.template = template
+        self.margin = margin
+        self.built = False
+        self._allocate()
+
+    def _allocate(self):
+        shape = (self.template.totalPointNum,
+                 len(self.world.crustStore.active))
+        # cell of each plate lying beneath each reference cell,
+        # as a position with negative indices wrapped around
+        self.local = numpy.zeros(shape, dtype=numpy.int32)
+        # the same, where that cell is occupied by crust, otherwise -1
+        self.cells = numpy.full(shape, -1, dtype=numpy.int32)
+        # the inverse of local: the reference cells lying above each cell
+        # of a plate are references[starts[id]:starts[id + 1]]
+        self.references = numpy.zeros(shape, dtype=numpy.int32)
+        self.starts = numpy.zeros((shape[0] + 1, shape[1]), dtype=numpy.int32)
+        # whether each plate has crust in or next to that cell
+        self.reach = numpy.zeros(shape, dtype=bool)
+
+    def _getReachable(self, plate):
+        """Returns a mask over the cells of a plate of those
+        in or next to occupied cells
+
+        """
+        occupied = self.world.crustStore.occupied[plate.index]
+        return occupied | occupied[plate.grid.neighbors].any(axis=1)
+
+    def rebuild(self):
+        if self.cells.shape[1] != len(self.world.crustStore.active):
+            self._allocate()
+        self.cells[:] = -1
+        self.reach[:] = False
+        store = self.world.crustStore
+        references = self.template.getCartesians()
+        for plate in self.world.plates:
+            local = plate.grid.getCartesianIndices(references) \
+                % self.template.totalPointNum
+            self.local[:, plate.index] = local
+            order = numpy.argsort(local, kind='stable')
+            self.references[:, plate.index] = order
+            self.starts[:, plate.index] = numpy.searchsorted(
+                local[order], numpy.arange(len(local) + 1))
+            self.cells[:, plate.index] = numpy.where(
+                store.occupied[plate.index][local], local, -1)
+            self.reach[:, plate.index] = self._getReachable(plate)[local]
+        neighbors = self.template.neighbors
+        for i in range(self.margin):
+            self.reach |= self.reach[neighbors].any(axis=1)
+        self.built = True
+
+    def getReferences(self, index, ids):
+        """Returns the reference cells lying above the given cell positions
+        of the plate with index
+
+        """
+        starts = self.starts[:, index]
+        ids = numpy.asarray(ids)
+        firsts = starts[ids]
+        counts = starts[ids + 1] - firsts
+        offsets = numpy.arange(counts.sum()) - \
+            numpy.repeat(numpy.cumsum(counts) - counts, counts)
+        return self.references[numpy.repeat(firsts, counts) + offsets, index]
+
+    def add(self, crust):
+        self.addAll(crust.plate, [crust.id])
+
+    def addAll(self, plate, ids):
+        """Records new crust in the given cells of a plate"""
+        if not self.built or not len(ids):
+            return
+        index = plate.index
+        ids = numpy.asarray(ids) % self.template.totalPointNum
+        placed = self.getReferences(index, ids)
+        self.cells[placed, index] = self.local[placed, index]
+        nearby = numpy.union1d(
+            plate.grid.neighbors[ids] % self.template.totalPointNum, ids)
+        reach = self.getReferences(index, nearby)
+        for i in range(self.margin):
+            reach = numpy.union1d(reach, self.template.neighbors[reach])
+        self.reach[reach, index] = True
+
+    def remove(self, crust):
+        if not self.built:
+            return
+        index = crust.plate.index
+        id = crust.id % self.template.totalPointNum
+        start, end = self.starts[id, index], self.starts[id + 1, index]
+        self.cells[self.references[start:end, index], index] = -1
+
+    def getPlateMask(self, cartesian):
+        """Returns a mask over plate indices of the plates
+        that may collide with a point
+
+        """
+        return self.reach[self.template.getCartesianIndex(cartesian)]
+
+    def getPlates(self, cartesian, plates=None):
+        """Returns plates that may collide with a point,
+        in the order given by plates if provided
+
+        """
+        mask = self.getPlateMask(cartesian)
+        if plates is None:
+            plates = self.world.plates
+        return [plate for plate in plates if mask[plate.index]]
+
+    def getCrusts(self, referenceId):
+        """Returns the crusts occupying a cell of the reference grid"""
+        store = self.world.crustStore
+        return [store.plates[index].grid[id]
+                for index, id in enumerate(self.cells[referenceId])
+                if id >= 0 and store.active[index]]
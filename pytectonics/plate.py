@@ -1,13 +1,22 @@
 from math import pi
 from pytectonics import GeoCoordinate, Crust
+from pytectonics.collisionbatch import CollisionBatch
 from pytectonics.utils import toCartesian, moment
-import random
+import numpy
 
 
 class Plate(GeoCoordinate):
     landElevation = 800
     oceanElevation = -1000
 
+    # debug mode, checks the boundary against a full rebuild on every refresh
+    checkBoundary = False
+
+    __slots__ = ('world', 'speed', 'eulerPole', 'grid', 'index',
+                 'densityOffset', '_collidable', '_riftable', '_changed',
+                 '_partners', '_stamps', '_generation', '_docking',
+                 '_groupMask', '_groupLabels')
+
     def __init__(self, spherical, world, grid,
                  speed=0, eulerPole=toCartesian((pi / 2, 0))):
         """speed is the absolute speed of a plate in km/Myr"""
@@ -16,15 +25,54 @@ class Plate(GeoCoordinate):
         self.speed = speed
         self.eulerPole = eulerPole
         self.grid = grid
-
-        self._collidable = None
-        self._riftable = None
-        self._collisions = [None for i in range(0, self.grid.totalPointNum)]
-        self._docking = set()
+        self.index = world.crustStore.addPlate(self)
+        self._reset()
 
         # density offsets are needed so that crust of one plate always subducts
         # crust of another, provided they are both of the same type
-        self.densityOffset = random.gauss(0, 40)  # Carlson & Raskin 1984
+        # Carlson & Raskin 1984
+        self.densityOffset = world.random.gauss(0, 40)
+
+    @classmethod
+    def restore(cls, world, grid, index, spherical, cartesian, speed,
+                eulerPole, densityOffset):
+        """Returns a plate holding the state given, as a checkpoint
+        is loaded. The plate is already registered with the store at index,
+        and draws nothing from the world's random state.
+
+        """
+        plate = cls.__new__(cls)
+        GeoCoordinate.__init__(plate, spherical, cartesian=cartesian)
+        plate.world = world
+        plate.speed = speed
+        plate.eulerPole = eulerPole
+        plate.grid = grid
+        plate.index = index
+        plate.densityOffset = densityOffset
+        plate._reset()
+        return plate
+
+    def _reset(self):
+        """Sets everything a plate works out for itself as it runs
+        to its state upon creation, for __init__ and restore alike
+
+        """
+        # boundary of the plate, as masks over its cells,
+        # kept up to date by refresh() from cells listed in _changed
+        self._collidable = numpy.zeros(self.grid.totalPointNum, dtype=bool)
+        self._riftable = numpy.zeros(self.grid.totalPointNum, dtype=bool)
+        self._changed = set()
+        # collision hints, the index of the plate each cell last collided
+        # with or -1, only valid while stamped with the current generation.
+        # Hints persist from step to step, clean() expires them all at once
+        self._partners = numpy.full(self.grid.totalPointNum, -1,
+                                    dtype=numpy.int32)
+        self._stamps = numpy.zeros(self.grid.totalPointNum, dtype=numpy.int32)
+        self._generation = 0
+        self._docking = set()
+        # component labels of the mask getGroup was last given, see getLabels
+        self._groupMask = None
+        self._groupLabels = None
 
     def __in__(self, crust):
         return crust in self.grid
@@ -40,114 +88,157 @@ class Plate(GeoCoordinate):
     velocity = property(_getVelocity, _setVelocity)
 
     def _getCollidable(self):
-        # TODO: there are a lot of related lazy loading properties here
-        # might do with something initialized
-        if not self._collidable:
-            self._collidable = set([crust for crust in self.grid if
-                                    any(self.getCollidableNeighborIds(crust))])
-        return self._collidable.copy()  # copy() invoked for use in loops
+        self.refresh()
+        return set([self.grid[i] for i in numpy.flatnonzero(self._collidable)])
 
     collidable = property(_getCollidable)
 
     def _getRiftable(self):
-        if not self._riftable:
-            self._riftable = set()
-            for crust in self.collidable:
-                if not crust.subductedBy:
-                    for id in self.getRiftableNeighborIds(crust):
-                        self._riftable.add(id)
-        return self._riftable.copy()  # copy() invoked for use in loops
+        self.refresh()
+        return set(self.grid.getIndicesAt(
+            numpy.flatnonzero(self._riftable)).tolist())
 
     riftable = property(_getRiftable)
 
+    def getBoundary(self):
+        """Returns masks over the cells of the plate of collidable crust,
+        crust bordering empty or subducted cells, and of riftable cells,
+        empty cells bordering crust that isn't subducted.
+        The masks are computed from scratch, refresh() keeps
+        the plate's own masks equal to these through local edits.
+
+        """
+        store = self.world.crustStore
+        occupied = store.occupied[self.index]
+        subducted = occupied & (store.subductedBy[self.index] >= 0)
+        neighbors = self.grid.neighbors
+        collidable = occupied & (~occupied | subducted)[neighbors].any(axis=1)
+        riftable = numpy.zeros(self.grid.totalPointNum, dtype=bool)
+        riftable[neighbors[occupied & ~subducted]] = True
+        return collidable, riftable & ~occupied
+
+    def refresh(self):
+        """Brings collidable and riftable up to date with cells
+        whose crust has changed since the last refresh.
+        Only cells within reach of the changes are recomputed,
+        so the cost scales with the number of changes, not plate area.
+
+        """
+        if self._changed:
+            store = self.world.crustStore
+            occupied = store.occupied[self.index]
+            subductedBy = store.subductedBy[self.index]
+            neighbors = self.grid.neighbors
+            reverseNeighbors = self.grid.reverseNeighbors
+            changed = numpy.array(list(self._changed))
+            self._changed = set()
+
+            # collidable depends upon a cell and the cells it neighbors
+            ids = numpy.union1d(changed, reverseNeighbors[changed]) \
+                % self.grid.totalPointNum
+            nearby = neighbors[ids]
+            self._collidable[ids] = occupied[ids] & \
+                (~occupied[nearby] | (subductedBy[nearby] >= 0)).any(axis=1)
+
+            # riftable depends upon a cell and the cells neighboring it
+            ids = numpy.union1d(changed, neighbors[changed]) \
+                % self.grid.totalPointNum
+            nearby = reverseNeighbors[ids]
+            self._riftable[ids] = ~occupied[ids] & \
+                (occupied[nearby] & (subductedBy[nearby] < 0)).any(axis=1)
+
+        if self.checkBoundary:
+            collidable, riftable = self.getBoundary()
+            assert numpy.array_equal(collidable, self._collidable), \
+                'collidable out of date at %s' % numpy.flatnonzero(
+                    collidable != self._collidable)
+            assert numpy.array_equal(riftable, self._riftable), \
+                'riftable out of date at %s' % numpy.flatnonzero(
+                    riftable != self._riftable)
+
     def add(self, crust):
         self.grid.add(crust)
-        if self._collidable:
-            for neighbor in self.grid.getNeighbors(crust):
-                if any(self.getCollidableNeighborIds(neighbor)):
-                    self._collidable.add(neighbor)
-                elif neighbor in self._collidable:
-                    self._collidable.remove(neighbor)
-        if self._riftable:
-            if not crust.subductedBy:
-                for id in self.getRiftableNeighborIds(crust):
-                    self._riftable.add(id)
-                if crust.id in self._riftable:
-                    self._riftable.remove(crust.id)
+        self.world.crustStore.occupied[crust._key] = True
+        self.world.ownership.add(crust)
+        self.world.caps.addAll(self, [crust.id])
+        self._changed.add(crust._key[1])
+
+    def addAll(self, crusts):
+        """Adds many crusts at once.
+        Equivalent to calling add for each, but the ownership index and
+        caps are updated once for all of them.
+
+        """
+        if not crusts:
+            return
+        for crust in crusts:
+            self.grid.add(crust)
+        ids = [crust.id for crust in crusts]
+        self.world.crustStore.occupied[self.index, ids] = True
+        self.world.ownership.addAll(self, ids)
+        self.world.caps.addAll(self, ids)
+        self._changed.update(crust._key[1] for crust in crusts)
 
     def update(self, crust):
         """Occurs upon subducting, becoming subducted, and refresh"""
-        if self._collidable:
-            self._collidable.add(crust)
-            for neighbor in self.grid.getNeighbors(crust):
-                self._collidable.add(neighbor)
-        if self._riftable:
-            if crust.subductedBy:
-                for neighborId in self.getRiftableNeighborIds(crust):
-                    if neighborId in self._riftable:
-                        self._riftable.remove(neighborId)
-                if crust.id in self._riftable:
-                    self._riftable.remove(crust.id)
+        self._changed.add(crust._key[1])
 
     def remove(self, crust):
         self.grid.remove(crust)
-        if self._collidable:
-            if crust in self._collidable:
-                self._collidable.remove(crust)
-        if self._riftable:
-            for id in self.getRiftableNeighborIds(crust):
-                if id in self._riftable:
-                    self._riftable.remove(id)
-            for neighbor in self.grid.getNeighbors(crust):
-                if not neighbor.subductedBy:
-                    for id in self.getRiftableNeighborIds(neighbor):
-                        self._riftable.add(id)
-
-    def getCollidableNeighborIds(self, crusts):
-        for neighborId in self.grid.getNeighborIds(crusts):
-            if not self.grid[neighborId]:
-                yield neighborId
-            elif self.grid[neighborId].subductedBy:
-                yield neighborId
-
-    def getRiftableNeighborIds(self, crusts):
-        for neighborId in self.grid.getNeighborIds(crusts):
-            if not self.grid[neighborId]:
-                yield neighborId
-
-    def getGroups(self, crusts, getIsNeighbors=lambda crust1, crust2: True):
+        self.world.crustStore.occupied[crust._key] = False
+        self.world.crustStore.unlink(crust._index)
+        self.world.ownership.remove(crust)
+        self._changed.add(crust._key[1])
+
+    def getGroups(self, crusts):
         """Partitions a set of crusts into a list of groups
         who share neighbors with one another
 
         """
-        unprocessed = list(crusts)
-        while unprocessed:
-            crust = unprocessed[0]
-            unprocessed.remove(crust)
-            group = [crust]
-            neighbors = [crust]
-            while neighbors:
-                neighbors = [neighbor for neighbor in
-                             self.grid.getNeighbors(neighbors,
-                                                    getIsNeighbors=getIsNeighbors)
-                             if neighbor in unprocessed
-                             and neighbor not in group]
-                group += neighbors
-                for neighbor in neighbors:
-                    if neighbor in unprocessed:
-                        unprocessed.remove(neighbor)
+        crusts = list(crusts)
+        mask = numpy.zeros(self.grid.totalPointNum, dtype=bool)
+        positions = [crust._key[1] for crust in crusts]
+        mask[positions] = True
+        labels = self.grid.getComponentLabels(mask)
+        groups = {}
+        for crust, position in zip(crusts, positions):
+            groups.setdefault(labels[position], []).append(crust)
+        for group in groups.values():
             yield group
 
-    def getGroup(self, crust, getIsNeighbors=lambda crust1, crust2: True):
-        group = set([crust])
-        neighbors = [crust]
-        while neighbors:
-            neighbors = [neighbor for neighbor in
-                         self.grid.getNeighbors(neighbors,
-                                                getIsNeighbors=getIsNeighbors)
-                         if neighbor not in group]
-            group |= set(neighbors)
-        return group
+    def getLabels(self, mask):
+        """Returns the component labels of a mask over the cells of the
+        plate, as FibGrid.getComponentLabels, labeling afresh only when
+        the mask differs from the one last given
+
+        """
+        if self._groupMask is None or \
+                not numpy.array_equal(mask, self._groupMask):
+            self._groupMask = mask.copy()
+            self._groupLabels = self.grid.getComponentLabels(mask)
+        return self._groupLabels
+
+    def getGroup(self, crust, mask=None):
+        """Returns the crust connected to crust through cells within mask,
+        a mask over the cells of the plate, by default every occupied cell.
+        crust itself is always part of its group.
+
+        """
+        if mask is None:
+            mask = self.world.crustStore.occupied[self.index]
+        position = crust._key[1]
+        if not mask[position]:
+            mask = mask.copy()
+            mask[position] = True
+        labels = self.getLabels(mask)
+        group = numpy.flatnonzero(labels == labels[position])
+        return set([self.grid[i] for i in group])
+
+    def getContinents(self):
+        """Returns a mask over the cells of the plate of continental crust"""
+        store = self.world.crustStore
+        return store.occupied[self.index] & \
+            store.isContinent(store.getIndices(self))
 
     def getMass(self, crusts):
         """Returns angular mass / moment of inertia"""
@@ -180,11 +271,9 @@ class Plate(GeoCoordinate):
                 bottom) and not bottom.plate.isDockRequested(top):
             # merging plates together
             bottomP = bottom.plate
-            bottomGroup = bottomP.getGroup(bottom,
-                                           lambda crust1, crust2: crust2.isContinent())
+            bottomGroup = bottomP.getGroup(bottom, bottomP.getContinents())
             topP = top.plate
-            topGroup = topP.getGroup(top,
-                                     lambda crust1, crust2: crust2.isContinent())
+            topGroup = topP.getGroup(top, topP.getContinents())
             smaller, larger = sorted([bottomGroup, topGroup],
                                      key=lambda group: len(group))
 
@@ -199,8 +288,27 @@ class Plate(GeoCoordinate):
             for crust in smaller:
                 dockedTo._docking.add(crust)
 
+            stats = self.world.stats
+            if stats is not None:
+                stats.count('dockRequests')
+            events = self.world.events
+            if events is not None:
+                events.emit('dockRequest', bottom.cartesian, docking.index,
+                            dockedTo.index, len(smaller))
+
     def dock(self):
-        for crust in self._docking:
+        stats = self.world.stats
+        if stats is not None:
+            stats.count('docked', len(self._docking))
+        events = self.world.events
+        if events is not None and events.subscriptions:
+            # docked crust, recorded as one batch once all have docked
+            docked = [(crust.cartesian, crust.plate.index, crust._thickness)
+                      for crust in self._docking]
+        else:
+            events = None
+        # sorted so crust docks in the same order however the set was built
+        for crust in sorted(self._docking, key=lambda crust: crust._index):
 
             # TODO: subducted docking crust is added to thickness/density
 
@@ -238,78 +346,266 @@ class Plate(GeoCoordinate):
 
             # if all other efforts fails, replace existing crust
             if self.grid[id]:
-                if self.grid[id] in self._docking:
-                    print('overwriting')
+                if events is not None:
+                    replaced = self.grid[id]
+                    events.emit('dockingOverwritten'
+                                if replaced in self._docking
+                                else 'overwritten',
+                                replaced.cartesian, self.index,
+                                crust.plate.index, replaced._thickness)
                 self.grid[id].destroy()
+                if stats is not None:
+                    stats.count('destroyed')
 
             crust.copy(self, id)
 
-        for plate in self.world.plates:
-            plate._collidable = None
+        if events is not None and docked:
+            cartesians, others, thicknesses = zip(*docked)
+            events.emit('docked', cartesians, self.index, others, thicknesses)
         self._docking = set()
 
+    def getHint(self, id):
+        """Returns the index of the plate a cell was last found
+        to collide with, or -1
+
+        """
+        if self._stamps.item(id) != self._generation:
+            return -1
+        return self._partners.item(id)
+
+    def getHints(self, ids=None):
+        """Vectorized getHint, over every cell if ids aren't given"""
+        if ids is None:
+            partners, stamps = self._partners, self._stamps
+        else:
+            ids = numpy.asarray(ids, dtype=int)
+            partners, stamps = self._partners[ids], self._stamps[ids]
+        return numpy.where(stamps == self._generation, partners, -1)
+
+    def clearHint(self, id):
+        self._partners[id] = -1
+
     def trackCollisions(self, id, plate):
-        self._collisions[id] = plate
-        for neighborId in self.grid.getCellNeighborIds(id):
-            self._collisions[neighborId] = plate
+        """Hints that a cell and its neighbors collide with plate"""
+        partners, stamps = self._partners, self._stamps
+        partners[id] = plate.index
+        stamps[id] = self._generation
+        # written one by one, as a handful of cells is quicker so than at once
+        for neighborId in self.grid.neighbors[id].tolist():
+            partners[neighborId] = plate.index
+            stamps[neighborId] = self._generation
 
     def getCollisions(self, cartesian, plates, approx=False):
-        """"Returns all collisions between cartesian and other plates"""
-        for plate in plates:
+        """"Returns all collisions between cartesian and other plates.
+        Only plates the world's ownership index places near cartesian
+        are tested.
+
+        """
+        for plate in self.world.ownership.getPlates(cartesian, plates):
             collision = plate.grid.getCollision(cartesian, approx=approx)
             if collision:
                 yield collision
         yield None
 
+    def getCollisionIndices(self, cartesians, plates, hints=None,
+                            approx=False):
+        """Batched getCollisions.
+        Takes an (N,3) array of world positions and, for each,
+        returns the flat crust store index of the first collision
+        getCollisions would yield, or -1 where there is none.
+        Where hints are given, a position whose hint is a plate index
+        is only tested against that plate, as with getHint.
+
+        """
+        store = self.world.crustStore
+        collisions = numpy.full(len(cartesians), -1, dtype=numpy.int64)
+        if not len(cartesians):
+            return collisions
+        reach = self.world.ownership.reach[
+            self.world.template.getCartesianIndices(cartesians)]
+        hints = numpy.asarray(hints) if hints is not None \
+            else numpy.full(len(cartesians), -1)
+        for plate in plates:
+            rows = numpy.flatnonzero((collisions < 0) &
+                                     reach[:, plate.index] &
+                                     ((hints < 0) | (hints == plate.index)))
+            if not len(rows):
+                continue
+            ids = plate.grid.getCartesianIndices(cartesians[rows])
+            occupied = store.occupied[plate.index]
+            hit = occupied[ids]
+            if not approx:
+                # fall back to the nearest occupied neighbor, as getNearest
+                neighbors = plate.grid.neighbors[ids]
+                offsets = plate.grid.getCartesians()[neighbors] - \
+                    cartesians[rows][:, None]
+                distances = numpy.sqrt((offsets**2).sum(axis=2))
+                distances[~occupied[neighbors]] = numpy.inf
+                nearest = neighbors[numpy.arange(len(ids)),
+                                    distances.argmin(axis=1)]
+                ids = numpy.where(hit, ids, nearest)
+                hit = occupied[ids]
+            collisions[rows[hit]] = store.getIndex(plate, ids[hit])
+        return collisions
+
     def getNeighborPlates(self):
         return [plate for plate in self.world.plates
                 if plate != self]
 
-    def rift(self):
+    def getNearbyPlates(self):
+        """Returns the plates whose caps meet this plate's,
+        nearest first
+
+        """
         # sort plates by distance to self for optimization purposes
-        plates = sorted(self.getNeighborPlates(),
-                        key=lambda plate: plate.getArcDistance(self))
-        for id in self.riftable:
-            # if I placed a crust here, would it collide with another plate?
-            collidable = self._collisions[id]
-            collidable = [collidable] if collidable else plates
-
-            cartesian = self.grid.getCartesian(id)
-            collision = next(self.getCollisions(cartesian, collidable))
+        return sorted(self.world.caps.getPlates(self,
+                                                self.getNeighborPlates()),
+                      key=lambda plate: plate.getArcDistance(self))
+
+    def getLookup(self, ids, plates, approx):
+        """Returns the hints and collisions looked up for cells of the plate
+        given by ids, as collide and rift look them up before acting.
+        Only reads the world, so may run for several plates at once.
+
+        """
+        hints = self.getHints(ids)
+        collisions = self.getCollisionIndices(self.grid.getCartesians()[ids],
+                                              plates, hints, approx=approx)
+        return ids, hints, collisions
+
+    def getCollideLookup(self):
+        crusts = sorted(self.collidable, key=lambda crust: crust.id)
+        return self.getLookup([crust.id for crust in crusts],
+                              self.getNearbyPlates(), approx=True)
+
+    def refreshLookup(self, lookup, ids, plates):
+        """Brings a collide lookup made earlier in the phase up to date,
+        returning what getCollideLookup would return for ids now.
+        Cells not looked up before, or whose hint has changed since, are
+        looked up again, as are those whose collision was since removed.
+
+        """
+        store = self.world.crustStore
+        lookedUp = dict(zip(lookup[0], zip(lookup[1], lookup[2])))
+        hints = self.getHints(ids)
+        collisions = numpy.array([lookedUp[id][1] if id in lookedUp else -1
+                                  for id in ids], dtype=numpy.int64)
+        stale = numpy.array([id not in lookedUp or lookedUp[id][0] != hint
+                             for id, hint in zip(ids, hints.tolist())],
+                            dtype=bool)
+        stale |= (collisions >= 0) & \
+            ~store.occupied.ravel()[numpy.maximum(collisions, 0)]
+
+        rows = numpy.flatnonzero(stale)
+        if len(rows):
+            collisions[rows] = self.getCollisionIndices(
+                self.grid.getCartesians()[ids][rows], plates, hints[rows],
+                approx=True)
+        return ids, hints, collisions
+
+    def rift(self):
+        plates = self.getNearbyPlates()
+        ids, hints, collisions = self.getLookup(sorted(self.riftable), plates,
+                                                False)
+
+        # if I placed a crust here, would it collide with another plate?
+        store = self.world.crustStore
+        rifted = []
+        for id, hint, collision in zip(ids, hints.tolist(), collisions):
+            collision = store.getCrust(collision)
+            # collisions tracked since the lookup may narrow the search
+            tracked = self.getHint(id)
+            if tracked != hint and \
+                    (hint >= 0 or
+                     (collision and collision.plate.index != tracked)):
+                collision = next(self.getCollisions(
+                    self.grid.getCartesian(id),
+                    [store.plates[tracked]] if tracked >= 0 else plates))
             if not collision:
-                Crust(self, self.world, False, id)
-                self._collisions[id] = None
+                rifted.append(id)
+                self.clearHint(id)
             else:
                 self.trackCollisions(id, collision.plate)
                 collision.plate.trackCollisions(collision.id, self)
-
-    def collide(self):
-        # sort plates by distance to self for optimization purposes
-        plates = sorted(self.getNeighborPlates(),
-                        key=lambda plate: plate.getArcDistance(self))
-        for crust in self.collidable:
-            collidable = self._collisions[crust.id]
-            collidable = [collidable] if collidable else plates
-            collision = next(self.getCollisions(crust.cartesian,
-                                                collidable, approx=True))
-            if collision:
-                self.trackCollisions(crust.id, collision.plate)
-                collision.plate.trackCollisions(collision.id, self)
-                crust.collide(collision)
+        Crust.createAll(self, self.world, rifted)
+        stats = self.world.stats
+        if stats is not None:
+            stats.count('rifted', len(rifted))
+
+    def collide(self, lookups=None):
+        plates = self.getNearbyPlates()
+        crusts = sorted(self.collidable, key=lambda crust: crust.id)
+        ids = [crust.id for crust in crusts]
+        if lookups and self.index in lookups:
+            ids, hints, partners = self.refreshLookup(
+                lookups[self.index], ids, plates)
+        else:
+            ids, hints, partners = self.getLookup(ids, plates, True)
+
+        store = self.world.crustStore
+        batch = CollisionBatch(self)
+        for crust, hint, partner in zip(crusts, hints.tolist(), partners):
+            partnerPlate = store.plates[partner // store.cellNum] \
+                if partner >= 0 else None
+            # collisions tracked since the lookup may narrow the search
+            tracked = self.getHint(crust.id)
+            if tracked != hint and \
+                    (hint >= 0 or
+                     (partnerPlate and partnerPlate.index != tracked)):
+                batch.flush()
+                self.collideCrust(crust, plates)
+                continue
+
+            touched = batch.getTouched(crust._index, partner)
+            if batch.conflicts(touched):
+                batch.flush()
+                touched = batch.getTouched(crust._index, partner)
+            if partner >= 0 and not store.occupied.item(partner):
+                # crust collided with was destroyed since the lookup
+                batch.flush()
+                self.collideCrust(crust, plates)
+                continue
+
+            if partnerPlate:
+                collision = store.getCrust(partner)
+                self.trackCollisions(crust.id, partnerPlate)
+                partnerPlate.trackCollisions(collision.id, self)
             else:
-                self._collisions[crust.id] = None
-                if crust.subductedBy:
-                    crust.subductedBy.subducts = None
-                    crust.subductedBy = None
-                    self._collidable.remove(crust)
+                self.clearHint(crust.id)
+            batch.add(crust, partner, touched)
+        batch.flush()
+
+    def collideCrust(self, crust, plates):
+        """Collides a single crust, the per object equivalent of collide"""
+        tracked = self.getHint(crust.id)
+        collidable = [self.world.crustStore.plates[tracked]] \
+            if tracked >= 0 else plates
+        collision = next(self.getCollisions(crust.cartesian,
+                                            collidable, approx=True))
+        if collision:
+            self.trackCollisions(crust.id, collision.plate)
+            collision.plate.trackCollisions(collision.id, self)
+            crust.collide(collision)
+        else:
+            self.clearHint(crust.id)
+            if crust.subductedBy:
+                crust.subductedBy.subducts = None
+                crust.subductedBy = None
 
     def clean(self):
-        self._collidable = None
-        self._riftable = None
-        self._collisions = [None for i in range(0, self.grid.totalPointNum)]
+        """Forgets every collision hint, lazily, by moving on a generation"""
+        self._generation += 1
 
     def destroy(self):
+        events = self.world.events
+        if events is not None:
+            events.emit('plateDestroyed', self.cartesian, self.index, -1,
+                        self.world.crustStore.occupied[self.index].sum())
         self.world.plates.remove(self)
+        self.world.crustStore.removePlate(self)
+        stats = self.world.stats
+        if stats is not None:
+            stats.count('platesDestroyed')
         for crust in self.grid:
             if crust.isContinent():
                 nearestPlate = self.grid.getNearest(self.cartesian,
@@ -319,3 +615,5 @@ class Plate(GeoCoordinate):
                 if crust.subductedBy:
                     crust.subductedBy._thickness += crust._thickness
                 crust.destroy()
+                if stats is not None:
+                    stats.count('destroyed')
@@ -0,0 +1,119 @@
+import numpy
+from pytectonics.grid.cartesianarray import CartesianArray
+from pytectonics.fieldstream import fields, getTopIndices, getField
+from pytectonics.utils import toCartesianArray, toSphericalArray
+
+
+class Raster:
+    """Resamples fields of a world onto a regular lat/lon grid,
+    laid out as CartesianArray lays out the globe: rows of increasing lat
+    from the south pole, columns of increasing lon from 0.
+    Each pixel is looked up once in the template grid, which never moves.
+    Which crust lies on top in each template cell is taken from the world's
+    ownership index and kept until plates next move, so any number of
+    fields may be exported per step for little more than a gather each.
+
+    """
+
+    def __init__(self, world, width=1440, height=720):
+        self.world = world
+        self.array = CartesianArray(height, width)
+        lat, lon = self.array.getPositions()
+        self.lat = lat[:, 0]
+        self.lon = lon[0]
+        template = world.template
+        self.cells = template.getCartesianIndices(
+            toCartesianArray(lat, lon)).reshape(lat.shape) \
+            % template.totalPointNum
+        # pixels showing the globe, None where all do
+        self.mask = None
+        self._top = None
+        self._versions = None
+
+    def getTop(self):
+        """Returns the flat store index of the crust on top under each
+        template cell and a mask of cells with crust, see getTopIndices.
+        Recomputed only once plates have moved.
+
+        """
+        versions = (self.world.age,
+                    [plate.grid.frame.version
+                     for plate in self.world.crustStore.plates])
+        if versions != self._versions:
+            self._top = getTopIndices(self.world)
+            self._versions = versions
+        return self._top
+
+    def getField(self, field):
+        """Returns a field resampled onto the raster as a (height, width) array.
+        field is one of fieldstream.fields, an array over the cells of
+        the template grid, or an array shaped like the crust store columns.
+
+        """
+        top, found = self.getTop()
+        if isinstance(field, str):
+            values = getField(self.world, field, top, found)
+        else:
+            field = numpy.asarray(field)
+            if field.ndim == 2:
+                values = field.ravel()[top]
+                if values.dtype.kind == 'f':
+                    values = numpy.where(found, values, numpy.nan)
+            else:
+                values = field
+        return values[self.cells]
+
+    def getFields(self, names=fields):
+        return {name: self.getField(name) for name in names}
+
+    def export(self, file, names=fields, compress=True):
+        """Writes fields to an .npz file along with the lat and lon
+        of the rows and columns of the raster
+
+        """
+        save = numpy.savez_compressed if compress else numpy.savez
+        save(file, lat=self.lat, lon=self.lon, **self.getFields(names))
+
+
+class GlobeRaster(Raster):
+    """Resamples fields onto a square orthographic view of the globe,
+    centered upon the point center (lat, lon). Rows run from the top of
+    the view down, pixels off the globe are left out of mask.
+    lat and lon are those of each pixel, nan off the globe.
+
+    """
+
+    def __init__(self, world, size=720, center=(0, 0)):
+        self.world = world
+        self.center = center
+        lat, lon = center
+        middle = toCartesianArray(lat, lon)[0]
+        east = numpy.array([-numpy.sin(lon), 0, -numpy.cos(lon)])
+        north = numpy.cross(middle, east)
+        across = (numpy.arange(size) + 0.5) / size * 2 - 1
+        x, y = numpy.meshgrid(across, -across)
+        self.mask = x**2 + y**2 < 1
+        z = numpy.sqrt(numpy.maximum(1 - x**2 - y**2, 0))
+        cartesians = x[..., None] * east + y[..., None] * north + \
+            z[..., None] * middle
+        lat, lon = toSphericalArray(cartesians.reshape(-1, 3))
+        self.lat = numpy.where(self.mask, lat.reshape(x.shape), numpy.nan)
+        self.lon = numpy.where(self.mask, lon.reshape(x.shape), numpy.nan)
+        template = world.template
+        self.cells = template.getCartesianIndices(
+            cartesians.reshape(-1, 3)).reshape(x.shape) \
+            % template.totalPointNum
+        self._top = None
+        self._versions = None
+
+    def export(self, file, names=fields, compress=True):
+        """Writes fields to an .npz file along with the lat, lon and mask
+        of every pixel, fields of floats being nan off the globe
+
+        """
+        values = self.getFields(names)
+        for name, field in values.items():
+            if field.dtype.kind == 'f':
+                values[name] = numpy.where(self.mask, field, numpy.nan)
+        save = numpy.savez_compressed if compress else numpy.savez
+        save(file, lat=self.lat, lon=self.lon, mask=self.mask, **values)
@@ -0,0 +1,211 @@
+"""Headless rendering of a World to PNG images.
+
+Fields are resampled by a Raster (equirectangular) or GlobeRaster
+(orthographic), colored with numpy and encoded as PNG with zlib alone,
+so rendering needs neither a display nor any imaging library.
+
+"""
+
+import os
+import struct
+import threading
+import zlib
+from queue import Queue
+
+import numpy
+
+from pytectonics.raster import Raster, GlobeRaster
+
+modes = ['elevation', 'plate', 'crust']
+
+background = (0, 0, 0)
+
+# elevation (m) and the color at that elevation, interpolated between
+elevationColors = [(-6000, (8, 24, 72)),
+                   (-200, (60, 120, 190)),
+                   (0, (70, 140, 70)),
+                   (2000, (150, 140, 80)),
+                   (4000, (130, 100, 70)),
+                   (6000, (245, 245, 245))]
+
+crustColors = {'ocean': (40, 80, 160), 'continent': (150, 120, 80)}
+
+
+def writePNG(file, rgb, level=6):
+    """Writes a (height, width, 3) array of 8 bit colors to file as a PNG"""
+    rgb = numpy.asarray(rgb, dtype=numpy.uint8)
+    height, width = rgb.shape[:2]
+    # each row is prefixed with filter type 0, none
+    rows = numpy.zeros((height, 1 + width * 3), dtype=numpy.uint8)
+    rows[:, 1:] = rgb.reshape(height, -1)
+
+    def chunk(tag, data):
+        return struct.pack('>I', len(data)) + tag + data + \
+            struct.pack('>I', zlib.crc32(tag + data) & 0xffffffff)
+
+    with open(file, 'wb') as png:
+        png.write(b'\x89PNG\r\n\x1a\n')
+        png.write(chunk(b'IHDR', struct.pack('>IIBBBBB',
+                                             width, height, 8, 2, 0, 0, 0)))
+        png.write(chunk(b'IDAT', zlib.compress(rows.tobytes(), level)))
+        png.write(chunk(b'IEND', b''))
+
+
+def getPlateColors(plates):
+    """Returns a distinct color for each plate index up to plates,
+    hues spaced by the golden angle
+
+    """
+    hue = (numpy.arange(plates) * 0.618033988749895) % 1 * 6
+    sector = hue.astype(int)
+    fraction = hue - sector
+    falling, rising = 1 - fraction, fraction
+    ones, zeros = numpy.ones(plates), numpy.zeros(plates)
+    channels = [(ones, rising, zeros), (falling, ones, zeros),
+                (zeros, ones, rising), (zeros, falling, ones),
+                (rising, zeros, ones), (ones, zeros, falling)]
+    rgb = numpy.zeros((plates, 3))
+    for index, (red, green, blue) in enumerate(channels):
+        chosen = sector == index
+        rgb[chosen] = numpy.stack([red, green, blue], axis=1)[chosen]
+    return (55 + 180 * rgb).astype(numpy.uint8)
+
+
+def colorElevation(elevation):
+    heights = [height for height, color in elevationColors]
+    rgb = numpy.stack([numpy.interp(elevation, heights,
+                                    [color[channel]
+                                     for height, color in elevationColors])
+                       for channel in range(3)], axis=-1)
+    rgb[numpy.isnan(elevation)] = background
+    return rgb.astype(numpy.uint8)
+
+
+def colorPlates(plates, plateNum):
+    colors = numpy.vstack([getPlateColors(plateNum), [background]])
+    return colors[numpy.where(plates >= 0, plates, plateNum)]
+
+
+def colorCrust(plates, continent):
+    rgb = numpy.empty(plates.shape + (3,), dtype=numpy.uint8)
+    rgb[:] = crustColors['ocean']
+    rgb[continent] = crustColors['continent']
+    rgb[plates < 0] = background
+    return rgb
+
+
+colors = {'elevation': colorElevation, 'plate': colorPlates,
+          'crust': colorCrust}
+
+
+def sample(raster, mode):
+    """Returns the fields of the world that mode is colored from,
+    resampled onto raster
+
+    """
+    if mode == 'elevation':
+        return [raster.getField('elevation')]
+    elif mode == 'plate':
+        return [raster.getField('plate'), len(raster.world.crustStore.active)]
+    elif mode == 'crust':
+        return [raster.getField('plate'), raster.getField('continent')]
+    raise ValueError('unknown mode %s' % mode)
+
+
+def paint(raster, mode, fields):
+    """Returns the image of fields sampled for mode,
+    rows from the top of the image down
+
+    """
+    rgb = colors[mode](*fields)
+    if raster.mask is not None:
+        rgb[~raster.mask] = background
+    if not isinstance(raster, GlobeRaster):
+        # rasters run from the south pole
+        rgb = rgb[::-1]
+    return rgb
+
+
+def render(raster, mode='elevation'):
+    """Returns the image of a world as seen through a raster,
+    colored by elevation, plate or crust (continent or ocean)
+
+    """
+    return paint(raster, mode, sample(raster, mode))
+
+
+class Renderer:
+    """A stage of World.update that writes a PNG of the world every
+    updates, one per mode, named by mode and age into directory.
+    Images are resampled on the updating thread, then colored, encoded
+    and written on a background thread behind a queue of at most
+    queueSize images.
+
+    """
+
+    def __init__(self, world, directory, modes=modes, every=1,
+                 projection='equirectangular', size=(1440, 720),
+                 center=(0, 0), queueSize=8):
+        if projection == 'equirectangular':
+            self.raster = Raster(world, *size)
+        elif projection == 'orthographic':
+            self.raster = GlobeRaster(world, size[1], center)
+        else:
+            raise ValueError('unknown projection %s' % projection)
+        self.directory = directory
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+        for mode in modes:
+            if mode not in colors:
+                raise ValueError('unknown mode %s' % mode)
+        self.modes = list(modes)
+        self.every = every
+        self.step = 0
+        self.error = None
+        self._queue = Queue(queueSize)
+        self._thread = threading.Thread(target=self._run)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def getPath(self, mode, age):
+        return os.path.join(self.directory, '%s-%08.2f.png' % (mode, age))
+
+    def update(self, world):
+        self.step += 1
+        if self.step % self.every == 0:
+            self.write(world)
+
+    def write(self, world):
+        """Queues images of the world as it is now"""
+        if self.error:
+            raise self.error
+        for mode in self.modes:
+            self._queue.put((self.getPath(mode, world.age), mode,
+                             sample(self.raster, mode)))
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            if self.error:
+                continue
+            path, mode, fields = item
+            try:
+                writePNG(path, paint(self.raster, mode, fields))
+            except Exception as error:
+                self.error = error
+
+    def close(self):
+        """Writes every queued image"""
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+        if self.error:
+            raise self.error
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
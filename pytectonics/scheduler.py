@@ -0,0 +1,41 @@
+from concurrent.futures import ThreadPoolExecutor
+
+
+class PlateScheduler:
+    """Runs collide with the overlap tests of every plate done at once
+    on worker threads, ahead of the plates acting on them.
+    Plates still act one after another, in the same order as without a
+    scheduler, each first bringing its lookup up to date with what the
+    plates before it changed (Plate.refreshLookup), so results are the
+    same as running serially.
+    The overlap tests are array operations, which release the GIL
+    for much of their time, so a scheduler only pays given several cores.
+    Rift is left serial, as bringing its lookups up to date with crust
+    rifted meanwhile repeats most of the tests done ahead.
+    Set world.scheduler to a scheduler to use it, or None, the default,
+    to run serially. benchmark.py --workers measures it.
+
+    """
+
+    def __init__(self, world, workers=None):
+        self.world = world
+        self.pool = ThreadPoolExecutor(workers)
+
+    def getLookups(self, method):
+        """Returns the lookups of every plate made by the plate method named,
+        by plate index
+
+        """
+        plates = list(self.world.plates)
+        # cached positions are built up front rather than raced for
+        self.world.template.getCartesians()
+        for plate in plates:
+            plate.grid.getCartesians()
+        lookups = self.pool.map(lambda plate: getattr(plate, method)(), plates)
+        return dict(zip([plate.index for plate in plates], lookups))
+
+    def collide(self):
+        self.world._forEachPlate('collide', self.getLookups('getCollideLookup'))
+
+    def close(self):
+        self.pool.shutdown()
@@ -0,0 +1,104 @@
+"""Opt in timing and event counts for World.update.
+
+Set world.stats to a Stats to start recording. While world.stats is None,
+update runs exactly as it otherwise would, and each place an event is
+counted costs a single attribute test.
+
+"""
+
+import json
+import time
+from collections import deque
+
+# events counted during each step, subductions counting crust
+# only as it is first subducted
+events = ['collisions', 'subductions', 'eruptions', 'destroyed', 'rifted',
+          'dockRequests', 'docked', 'platesDestroyed']
+
+
+class Stats:
+    """Records, for each step of a world, the wall time of each phase of
+    update, the time each plate spent in each per plate phase,
+    and counts of events.
+    The last history steps are kept, oldest first, as dictionaries of
+    age, phases, plates (phase to plate index to time) and counts.
+
+    """
+
+    def __init__(self, history=1000):
+        self.steps = deque(maxlen=history)
+        self._start()
+
+    def _start(self):
+        self.current = {'phases': {},
+                        'plates': {},
+                        'counts': dict.fromkeys(events, 0)}
+
+    def count(self, event, number=1):
+        self.current['counts'][event] += number
+
+    def timePhase(self, phase, seconds):
+        phases = self.current['phases']
+        phases[phase] = phases.get(phase, 0.0) + seconds
+
+    def timePlate(self, phase, plate, seconds):
+        plates = self.current['plates'].setdefault(phase, {})
+        plates[plate.index] = plates.get(plate.index, 0.0) + seconds
+
+    def endStep(self, world):
+        """Files the step being recorded under the age of world"""
+        self.current['age'] = world.age
+        self.steps.append(self.current)
+        self._start()
+
+    def _getLast(self):
+        return self.steps[-1] if self.steps else None
+
+    last = property(_getLast)
+
+    def getTotals(self, steps=None):
+        """Returns times and counts summed over the last number of steps,
+        by default every step kept
+
+        """
+        recorded = list(self.steps)
+        if steps is not None:
+            recorded = recorded[len(recorded) - steps:] if steps else []
+        totals = {'steps': len(recorded),
+                  'age': recorded[-1]['age'] if recorded else None,
+                  'phases': {},
+                  'plates': {},
+                  'counts': dict.fromkeys(events, 0)}
+        for step in recorded:
+            for phase, seconds in step['phases'].items():
+                totals['phases'][phase] = \
+                    totals['phases'].get(phase, 0.0) + seconds
+            for phase, plates in step['plates'].items():
+                phaseTotals = totals['plates'].setdefault(phase, {})
+                for index, seconds in plates.items():
+                    phaseTotals[index] = phaseTotals.get(index, 0.0) + seconds
+            for event, number in step['counts'].items():
+                totals['counts'][event] += number
+        return totals
+
+
+class StatsExporter:
+    """A stage of World.update that appends a summary of the world's stats
+    to a file every interval updates, as one line of JSON holding
+    the totals over those updates
+
+    """
+
+    def __init__(self, path, interval=10):
+        self.path = path
+        self.interval = interval
+        self.step = 0
+
+    def update(self, world):
+        self.step += 1
+        if world.stats is None or self.step % self.interval:
+            return
+        totals = world.stats.getTotals(self.interval)
+        totals['time'] = time.time()
+        with open(self.path, 'a') as file:
+            file.write(json.dumps(totals, sort_keys=True) + '\n')
@@ -0,0 +1,170 @@
+"""Building a World upon a finer grid from one run at a coarser resolution.
+
+Plates keep their rows in the crust store, their frames and their motion,
+so the fine world is the coarse world seen through a finer grid: every fine
+cell of a plate takes after the coarse cells of the same plate around it.
+Cell state is remapped in the arrays of a checkpoint, which the fine world
+is then built from, so it holds no references into the coarse world.
+
+    world = World(radius=6367, resolution=36, ...)
+    for i in range(300):
+        world.update(1.0)
+    world = world.upsample(72)
+
+"""
+
+from math import pi, sqrt
+
+import numpy
+
+from pytectonics import checkpoint
+from pytectonics import grid as grids
+
+# columns whose values are blended between coarse cells,
+# every other column is taken from the nearest coarse cell
+blended = ['thickness', 'density', 'displacement']
+
+# columns of links between crusts, as flat indices
+links = ['subducts', 'subductedBy', 'firstSubductedBy']
+
+
+def getNearest(grid, cartesians, rings=3, chunk=4096):
+    """Returns the position of the cell of grid nearest each of an (N,3)
+    array of positions in the grid's frame. Grid lookups are approximate,
+    most of all near the poles, so the cells within rings of neighbors
+    of the cell looked up are searched for the nearest,
+    chunk positions at a time.
+
+    """
+    nearest = grid.getCartesianIndices(cartesians) % grid.totalPointNum
+    points = grid.getCartesians()
+    for start in range(0, len(cartesians), chunk):
+        cells = nearest[start:start + chunk, None]
+        for i in range(rings):
+            cells = numpy.hstack([cells, grid.neighbors[cells].reshape(
+                len(cells), -1) % grid.totalPointNum])
+        offsets = points[cells] - cartesians[start:start + chunk, None]
+        distances = (offsets * offsets).sum(axis=2)
+        nearest[start:start + chunk] = \
+            cells[numpy.arange(len(cells)), distances.argmin(axis=1)]
+    return nearest
+
+
+def getWeights(coarse, fine, nearest):
+    """Returns, for each fine cell, the positions of the nearest coarse cell
+    and its neighbors, and the inverse square distance to each of them
+
+    """
+    candidates = numpy.column_stack(
+        [numpy.arange(coarse.totalPointNum),
+         coarse.neighbors % coarse.totalPointNum])[nearest]
+    offsets = coarse.getCartesians()[candidates] - \
+        fine.getCartesians()[:, None]
+    distances = numpy.sqrt((offsets * offsets).sum(axis=2))
+    return candidates, 1 / numpy.maximum(distances, 1e-9) ** 2
+
+
+def blend(arrays, candidates, weights):
+    """Blends each column in blended between the coarse cells listed
+    for each fine cell, counting only those of the same plate
+    that are like the nearest: occupied, of the same type of crust
+    and subducted alike
+
+    """
+    occupied = arrays['occupied']
+    subducted = numpy.zeros(occupied.shape, dtype=bool)
+    linked = arrays['subductedBy'] >= 0
+    subducted[linked] = occupied.ravel()[arrays['subductedBy'][linked]]
+    nearest = candidates[:, 0]
+    alike = occupied[:, candidates] & occupied[:, nearest, None] & \
+        (arrays['continent'][:, candidates] ==
+         arrays['continent'][:, nearest, None]) & \
+        (subducted[:, candidates] == subducted[:, nearest, None])
+    weights = numpy.where(alike, weights, 0)
+    # unoccupied cells keep the values of the nearest
+    weights[weights.sum(axis=2) == 0, 0] = 1
+    weights /= weights.sum(axis=2)[..., None]
+    return {name: (arrays[name][:, candidates] * weights).sum(axis=2)
+            for name in blended}
+
+
+def remapLinks(arrays, plates, coarse, fine, nearest):
+    """Returns the link columns remapped to flat indices of fine cells.
+    A link to crust of another plate goes to the fine cell of that plate
+    lying beneath the linking cell, where that cell stands for the coarse
+    cell linked to, otherwise to the fine cell closest to the coarse one.
+    Links to where crust first subducted always go to the closest cell.
+
+    """
+    coarseNum, fineNum = coarse.totalPointNum, fine.totalPointNum
+    # the fine cell nearest each coarse cell, or where there are ties,
+    # any fine cell taking after the coarse cell
+    closest = getNearest(fine, coarse.getCartesians())
+    following = numpy.full(coarseNum, -1)
+    following[nearest] = numpy.arange(fineNum)
+    closest = numpy.where((nearest[closest] == numpy.arange(coarseNum)) |
+                          (following < 0), closest, following)
+    points = fine.getCartesians()
+    occupied = arrays['occupied'][:, nearest]
+    remapped = {}
+    for name in links:
+        coarseLinks = arrays[name][:, nearest]
+        fineLinks = numpy.full(coarseLinks.shape, -1, dtype=numpy.int64)
+        for plate in range(len(plates)):
+            cells = numpy.flatnonzero(coarseLinks[plate] >= 0)
+            targets = coarseLinks[plate, cells]
+            others, targetCells = targets // coarseNum, targets % coarseNum
+            chosen = closest[targetCells]
+            if name != 'firstSubductedBy':
+                cartesians = plates[plate].grid.frame.frame_to_world_array(
+                    points[cells])
+                for other in numpy.unique(others):
+                    mask = others == other
+                    beneath = fine.getCartesianIndices(
+                        cartesians[mask], plates[other].grid.frame) % fineNum
+                    stands = (nearest[beneath] == targetCells[mask]) & \
+                        occupied[other, beneath]
+                    chosen[mask] = numpy.where(stands, beneath, chosen[mask])
+            fineLinks[plate, cells] = others * fineNum + chosen
+        remapped[name] = fineLinks
+    return remapped
+
+
+def upsample(world, resolution):
+    """Returns a new world holding the state of world upon the grid
+    of another resolution, typically finer. Crust fields, plate
+    membership, frames, subduction and docking are all carried over,
+    as are the age and random state of the world.
+
+    """
+    arrays = checkpoint.getArrays(world)
+    Grid = getattr(grids, str(arrays['grid']))
+    coarse = world.template
+    fine = Grid(2 * pi / resolution)
+    # fine and coarse templates share the identity frame, as do the
+    # cells of every plate in its own frame, so cells correspond the same
+    # way upon every plate
+    nearest = getNearest(coarse, fine.getCartesians())
+
+    candidates, weights = getWeights(coarse, fine, nearest)
+    fineArrays = blend(arrays, candidates, weights)
+    fineArrays.update(remapLinks(arrays, world.crustStore.plates,
+                                 coarse, fine, nearest))
+    for name in checkpoint.cellArrays:
+        if name not in fineArrays:
+            fineArrays[name] = arrays[name][:, nearest]
+
+    # every fine cell of a docking coarse cell docks
+    docking = numpy.zeros(arrays['occupied'].shape, dtype=bool)
+    docking[arrays['dockingPlate'],
+            arrays['docking'] % coarse.totalPointNum] = True
+    dockingPlate, docking = numpy.nonzero(docking[:, nearest] &
+                                          fineArrays['occupied'])
+    arrays['dockingPlate'] = dockingPlate
+    arrays['docking'] = dockingPlate * fine.totalPointNum + docking
+
+    arrays.update(fineArrays)
+    arrays['avgDistance'] = numpy.array(fine.avgDistance)
+    area = 4 * pi / fine.totalPointNum
+    arrays['minDistance'] = numpy.array(sqrt(2) * sqrt(area / sqrt(5)))
+    return checkpoint.build(type(world), arrays, fine)
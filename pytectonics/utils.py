@@ -3,7 +3,8 @@ Common mathematical constants and functions
 """
 
 from math import pi, sqrt, copysign, cos, sin, asin, atan2
-from numpy import cross, sqrt, array
+from numpy import cross, sqrt, array, asarray, arcsin, arctan2
+import numpy
 
 # mathmatical constants
 RIGHT_ANGLE = pi / 2
@@ -47,10 +48,46 @@ def toCartesian(spherical):
                   -cos(lat) * sin(lon)])
 
 
+def toCartesianArray(lat, lon):
+    """Vectorized toCartesian, takes arrays of lat and lon
+    and returns an (N,3) array
+
+    """
+    lat = asarray(lat, dtype=float).ravel()
+    lon = asarray(lon, dtype=float).ravel()
+    return numpy.stack([numpy.cos(lat) * numpy.cos(lon),
+                        numpy.sin(lat),
+                        -numpy.cos(lat) * numpy.sin(lon)], axis=1)
+
+
 def toSpherical(cartesian):
     return asin(cartesian[1]), atan2(-cartesian[2], cartesian[0])
 
 
+def toSphericalArray(cartesian):
+    """Converts an (N,3) array of cartesian coordinates to
+    arrays of lat and lon
+
+    """
+    cartesian = asarray(cartesian)
+    return (arcsin(cartesian[:, 1]),
+            arctan2(-cartesian[:, 2], cartesian[:, 0]))
+
+
+def getArcDistanceArray(cartesian1, cartesian2):
+    """Vectorized GeoCoordinate.getArcDistance between
+    two (N,3) arrays of cartesian coordinates
+
+    """
+    lat1, lon1 = toSphericalArray(cartesian1)
+    lat2, lon2 = toSphericalArray(cartesian2)
+    latChange = abs(lat1 - lat2)
+    lonChange = abs(lon1 - lon2)
+    return 2 * arcsin(sqrt(numpy.sin(latChange / 2) ** 2 +
+                           numpy.cos(lat1) * numpy.cos(lat2) *
+                           numpy.sin(lonChange / 2) ** 2))
+
+
 def moment(point, end1, end2=array((0, 0, 0))):
     """Returns the moment defined as the distance between a point
     and a line formed by two endpoints, end1 and end2.
@@ -60,3 +97,14 @@ def moment(point, end1, end2=array((0, 0, 0))):
     x = cross(point - end2, point - end1)
     y = end1 - end2
     return sqrt(x.dot(x)) / sqrt(y.dot(y))
+
+
+def getDistanceArray(cartesians1, cartesians2):
+    """Vectorized GeoCoordinate.getDistance, returns an array of
+    the distance from each of cartesians1 (rows) to each of cartesians2
+
+    """
+    cartesians1 = asarray(cartesians1, dtype=float).reshape(-1, 3)
+    cartesians2 = asarray(cartesians2, dtype=float).reshape(-1, 3)
+    offsets = cartesians1[:, None, :] - cartesians2[None]
+    return sqrt((offsets * offsets).sum(axis=2))
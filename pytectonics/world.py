@@ -1,12 +1,20 @@
-from pytectonics import Plate, Crust, GeoCoordinate, FibGrid
-from pytectonics.utils import toCartesian
+from pytectonics import Plate, Crust, CrustStore, GeoCoordinate, FibGrid
+from pytectonics.ownershipindex import OwnershipIndex
+from pytectonics.capindex import CapIndex
+from pytectonics import checkpoint, upsample
+from pytectonics.utils import toCartesian, getDistanceArray
 from math import sqrt, pi, asin
 import random
+import time
+import numpy
 
 
 class World:
     # lengths in m, density in kg/m^3
 
+    # phases of update, in the order they run
+    phases = ['move', 'isostacy', 'collide', 'dock', 'rift', 'clean']
+
     mantleDensity = 3300
     waterDensity = 1026
     oceanCrustDensity = 2890  # Carlson & Raskin 1984
@@ -17,30 +25,54 @@ class World:
 
     def __init__(self, radius, resolution, plateNum,
                  continentNum, continentSize,
-                 maxMountainWidth=300, Grid=FibGrid):
+                 maxMountainWidth=300, Grid=FibGrid, seed=None):
+        """seed sets the world's own random number generator,
+        from which every random choice the world makes is drawn
+
+        """
         self.age = 0
+        self.seed = seed
+        self.random = random.Random(seed)
+        # stages run after every update, given the world, see FieldWriter
+        self.stages = []
+        # timing and event counts of updates, see pytectonics.stats
+        self.stats = None
+        # tectonic events of updates, see pytectonics.events
+        self.events = None
+        # runs collide in parallel, see PlateScheduler, None runs serially
+        self.scheduler = None
 
         self.radius = radius
         avgPointDistance = 2 * pi / resolution
 
         template = Grid(avgPointDistance)
+        self.template = template
+        self.crustStore = CrustStore(self, template.totalPointNum, plateNum)
+        self.ownership = OwnershipIndex(self, template)
+        self.caps = CapIndex(self)
         self.plates = [Plate(GeoCoordinate(self.randomPoint()),
                              self,
-                             Grid(avgPointDistance,
-                                  mapping=template.mapping),
-                             random.gauss(42.8, 27.7),
+                             template.getSharedGrid(),
+                             self.random.gauss(42.8, 27.7),
                              toCartesian(self.randomPoint()))
                        for i in range(plateNum)]
         shields = [GeoCoordinate(self.randomPoint())
                    for i in range(continentNum)]
         continentSize = self.distanceToRadians(continentSize)
 
-        for i in template.getIndices():
-            cartesian = template.getCartesian(i)
-            nearestPlate = template.getNearest(cartesian, points=self.plates)
-            isContinent = any([shield.getDistance(cartesian) < continentSize
-                               for shield in shields])
-            Crust(nearestPlate, self, isContinent, id=i)
+        # each cell goes to the nearest plate,
+        # and is continental if near enough any shield
+        cartesians = template.getCartesians()
+        nearestPlates = getDistanceArray(
+            [plate.cartesian for plate in self.plates], cartesians).argmin(0)
+        isContinent = (getDistanceArray([shield.cartesian
+                                         for shield in shields],
+                                        cartesians) < continentSize).any(0)
+        for index, plate in enumerate(self.plates):
+            positions = numpy.flatnonzero(nearestPlates == index)
+            Crust.createAll(plate, self,
+                            template.getIndicesAt(positions).tolist(),
+                            isContinent[positions])
 
         self.seaLevel = 3790
         self.maxMountainWidth = maxMountainWidth
@@ -54,8 +86,8 @@ class World:
         evenly distributes points, correctly considering curvature of globe
 
         """
-        return (asin(2 * random.random() - 1),
-                2 * pi * random.random())
+        return (asin(2 * self.random.random() - 1),
+                2 * pi * self.random.random())
 
     def distanceToRadians(self, distance):
         return float(distance) / self.radius
@@ -63,43 +95,96 @@ class World:
     def radiansToDistance(self, radians):
         return radians * self.radius
 
+    def save(self, file, delta=False):
+        """Writes a checkpoint of the world to the path file.
+        A delta checkpoint only holds the cells that changed since
+        the last full checkpoint, which must be kept alongside it.
+
+        """
+        checkpoint.save(self, file, delta)
+
+    @classmethod
+    def load(cls, file):
+        """Returns a world restored from a checkpoint"""
+        return checkpoint.load(cls, file)
+
+    def upsample(self, resolution):
+        """Returns a copy of the world upon a grid of another resolution,
+        so a world may be spun up cheaply at a coarse resolution
+        before it is run at a fine one
+
+        """
+        return upsample.upsample(self, resolution)
+
     def __iter__(self):
         for plate in self.plates:
             for crust in plate.grid:
                 yield crust
 
+    def _forEachPlate(self, phase, *args):
+        """Runs a phase upon each plate, timing each plate if stats are kept"""
+        stats = self.stats
+        for plate in self.plates:
+            if stats is None:
+                getattr(plate, phase)(*args)
+            else:
+                start = time.perf_counter()
+                getattr(plate, phase)(*args)
+                stats.timePlate(phase, plate, time.perf_counter() - start)
+
     def dock(self):
-        for plate in self.plates: plate.dock()
+        self._forEachPlate('dock')
 
     def move(self, timestep):
-        for plate in self.plates:
-            plate.move(timestep)
+        self._forEachPlate('move', timestep)
+        self.ownership.rebuild()
+        self.caps.rebuild()
 
     def collide(self):
-        for plate in self.plates:
-            plate.collide()
+        if self.scheduler is None:
+            self._forEachPlate('collide')
+        else:
+            self.scheduler.collide()
 
     def rift(self):
-        for plate in self.plates:
-            plate.rift()
+        self._forEachPlate('rift')
 
     def isostacy(self):
-        for crust in self:
-            crust.isostacy()
+        self.crustStore.isostacy()
 
     def clean(self):
+        store = self.crustStore
         for plate in self.plates:
-            if not any([crust for crust in plate.grid
-                        if not crust.isContinent() and not crust.subductedBy]):
+            # plates are destroyed once no free floating ocean crust remains
+            indices = store.getIndices(plate)
+            ocean = store.occupied.ravel()[indices] & \
+                ~store.isContinent(indices) & ~store.isSubducted(indices)
+            if not ocean.any():
                 plate.destroy()
                 for other in plate.getNeighborPlates():
                     other.clean()
 
     def update(self, timestep):
-        self.move(timestep)
-        self.isostacy()
-        self.collide()
-        self.dock()
-        self.rift()
-        self.clean()
+        stats = self.stats
+        if stats is None:
+            self.move(timestep)
+            self.isostacy()
+            self.collide()
+            self.dock()
+            self.rift()
+            self.clean()
+        else:
+            for phase in self.phases:
+                start = time.perf_counter()
+                if phase == 'move':
+                    self.move(timestep)
+                else:
+                    getattr(self, phase)()
+                stats.timePhase(phase, time.perf_counter() - start)
         self.age += timestep
+        if stats is not None:
+            stats.endStep(self)
+        if self.events is not None:
+            self.events.endStep(self)
+        for stage in self.stages:
+            stage.update(self)
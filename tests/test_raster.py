@@ -0,0 +1,43 @@
+"""Tests exporting fields from rasters"""
+
+import numpy
+
+from pytectonics.fieldstream import fields
+from pytectonics.raster import Raster, GlobeRaster
+from pytectonics.world import World
+
+
+def makeWorld():
+    world = World(radius=6367, resolution=36, plateNum=8, continentNum=3,
+                  continentSize=2500, seed=1)
+    world.update(1.0)
+    return world
+
+
+def test_raster_export(tmp_path):
+    raster = Raster(makeWorld(), 72, 36)
+    file = str(tmp_path / 'raster.npz')
+    raster.export(file)
+    with numpy.load(file) as exported:
+        assert exported['lat'].shape == (36,)
+        assert exported['lon'].shape == (72,)
+        for name in fields:
+            assert exported[name].shape == (36, 72)
+
+
+def test_globe_raster_export(tmp_path):
+    raster = GlobeRaster(makeWorld(), 32, center=(0.5, 1.0))
+    file = str(tmp_path / 'globe.npz')
+    raster.export(file)
+    with numpy.load(file) as exported:
+        mask = exported['mask']
+        assert mask.shape == (32, 32)
+        assert mask.any() and not mask.all()
+        for name in ['lat', 'lon'] + list(fields):
+            assert exported[name].shape == (32, 32)
+        assert numpy.isnan(exported['lat'][~mask]).all()
+        assert not numpy.isnan(exported['lat'][mask]).any()
+        # the middle of the view looks down upon its center
+        assert numpy.allclose([exported['lat'][15:17, 15:17].mean(),
+                               exported['lon'][15:17, 15:17].mean()],
+                              [0.5, 1.0], atol=0.1)
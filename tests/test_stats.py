@@ -0,0 +1,75 @@
+"""Tests that Stats counts each subduction once, as it starts"""
+
+import numpy
+
+from pytectonics.collisionbatch import CollisionBatch
+from pytectonics.events import EventStream, types
+from pytectonics.stats import Stats
+from pytectonics.world import World
+
+
+def makeWorld(steps=5):
+    world = World(radius=6367, resolution=36, plateNum=8, continentNum=3,
+                  continentSize=2500, seed=1)
+    world.stats = Stats()
+    for i in range(steps):
+        world.update(1.0)
+    return world
+
+
+def getSubduction(world):
+    """Returns a top and bottom crust linked to one another
+    whose subduction continues
+
+    """
+    store = world.crustStore
+    subducts = store.subducts.ravel()
+    for bottom in numpy.flatnonzero(store.subductedBy.ravel() >= 0):
+        top = store.subductedBy.item(bottom)
+        if subducts[top] == bottom:
+            bottomCrust = store.getCrust(bottom)
+            if not bottomCrust.isDetaching():
+                return store.getCrust(top), bottomCrust
+    raise AssertionError('no sustained subduction found')
+
+
+def unlink(top, bottom):
+    top.subducts = None
+    bottom.subductedBy = None
+
+
+def getCount(world):
+    return world.stats.current['counts']['subductions']
+
+
+def test_relinked_subduction_counts_once():
+    world = makeWorld()
+    top, bottom = getSubduction(world)
+    count = getCount(world)
+    unlink(top, bottom)
+    bottom.collide(top)
+    assert bottom.subductedBy is not None
+    assert getCount(world) == count
+
+
+def test_relinked_subduction_counts_once_in_batch():
+    world = makeWorld()
+    top, bottom = getSubduction(world)
+    count = getCount(world)
+    unlink(top, bottom)
+    batch = CollisionBatch(bottom.plate)
+    batch.add(bottom, top._index, batch.getTouched(bottom._index, top._index))
+    batch.flush()
+    assert bottom.subductedBy is not None
+    assert getCount(world) == count
+
+
+def test_subductions_match_events():
+    world = makeWorld(0)
+    world.events = EventStream()
+    subscription = world.events.subscribe()
+    for i in range(10):
+        world.update(1.0)
+    events = subscription.read()
+    subductions = (events['type'] == types.index('subduction')).sum()
+    assert world.stats.getTotals()['counts']['subductions'] == subductions